@@ -0,0 +1,178 @@
+import os
+import json
+import asyncio
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "True").lower() == "true"
+# Requests processed at once per heavy route, and how many more may wait for a slot
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", 2))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", 4))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 10))
+# Heavy requests in flight (running or waiting) per admin, or per client IP without a token
+ADMISSION_MAX_PER_ADMIN = int(os.getenv("ADMISSION_MAX_PER_ADMIN", 1))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", 5))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 10 * 1024 * 1024))
+
+# Routes that parse uploads or whole sheets with pandas
+HEAVY_ROUTES = {
+    ("POST", "/api/salary/calculate-salary"),
+    ("POST", "/api/hours/upload"),
+    ("GET", "/api/sheets/client-hours"),
+    ("POST", "/api/auth/register/bulk"),
+}
+
+
+class RequestTooLarge(Exception):
+    pass
+
+
+class ConcurrencyLimiter:
+    """Semaphore with a bounded number of waiters and a wait timeout"""
+
+    def __init__(self, limit: int, queue_size: int, queue_timeout: float):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+
+    async def acquire(self) -> bool:
+        if not self.semaphore.locked():
+            # Free slot, acquire() returns without suspending
+            return await self.semaphore.acquire()
+        if self.waiting >= self.queue_size:
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        self.semaphore.release()
+
+
+class AdmissionControlMiddleware:
+    """Admission control and load shedding for the heavy upload/report routes.
+
+    - requests with a body larger than UPLOAD_MAX_BYTES get 413, from Content-Length when
+      sent, otherwise as soon as the streamed body goes over the limit
+    - each admin (or client IP) may have ADMISSION_MAX_PER_ADMIN heavy requests in flight,
+      further ones get 429
+    - each route runs ADMISSION_MAX_CONCURRENT requests at once with up to ADMISSION_QUEUE_SIZE
+      waiting for ADMISSION_QUEUE_TIMEOUT seconds, beyond that requests get 503
+
+    Rejections carry a Retry-After header. Other routes are not affected. The limits and
+    counters are per worker process.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.limiters = {
+            route: ConcurrencyLimiter(ADMISSION_MAX_CONCURRENT, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT)
+            for route in HEAVY_ROUTES
+        }
+        self.in_flight = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters.get((scope["method"], scope["path"].rstrip("/")))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = self._header(scope, b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > UPLOAD_MAX_BYTES:
+            await self._reject(send, 413, f"Upload too large. The limit is {UPLOAD_MAX_BYTES} bytes.")
+            return
+
+        client_key = self._client_key(scope)
+        if self.in_flight.get(client_key, 0) >= ADMISSION_MAX_PER_ADMIN:
+            await self._reject(send, 429, "Too many concurrent requests. Please retry later.", ADMISSION_RETRY_AFTER)
+            return
+
+        self.in_flight[client_key] = self.in_flight.get(client_key, 0) + 1
+        try:
+            if not await limiter.acquire():
+                await self._reject(send, 503, "Server is busy processing other uploads. Please retry later.", ADMISSION_RETRY_AFTER)
+                return
+            try:
+                await self._call_with_size_limit(scope, receive, send)
+            finally:
+                limiter.release()
+        finally:
+            self.in_flight[client_key] -= 1
+            if not self.in_flight[client_key]:
+                del self.in_flight[client_key]
+
+    async def _call_with_size_limit(self, scope, receive, send):
+        state = {"received": 0, "too_large": False, "response_started": False}
+
+        async def limited_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                state["received"] += len(message.get("body", b""))
+                if state["received"] > UPLOAD_MAX_BYTES:
+                    state["too_large"] = True
+                    raise RequestTooLarge()
+            return message
+
+        async def guarded_send(message):
+            # Once the body went over the limit, the app's own error response is replaced by 413
+            if state["too_large"]:
+                return
+            if message["type"] == "http.response.start":
+                state["response_started"] = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            # The app may wrap RequestTooLarge in its own error
+            if not state["too_large"]:
+                raise
+        if state["too_large"] and not state["response_started"]:
+            await self._reject(send, 413, f"Upload too large. The limit is {UPLOAD_MAX_BYTES} bytes.")
+
+    def _header(self, scope, name: bytes):
+        for header_name, value in scope["headers"]:
+            if header_name == name:
+                return value.decode("latin-1")
+        return None
+
+    def _client_key(self, scope):
+        # Decoding the token is enough to tell admins apart, it is fully validated by the route
+        authorization = self._header(scope, b"authorization")
+        if authorization:
+            scheme, _, token = authorization.partition(" ")
+            if scheme.lower() == "bearer" and token:
+                from jose import JWTError, jwt
+                from routes.auth import SECRET_KEY, ALGORITHM
+
+                try:
+                    email = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+                    if email:
+                        return f"admin:{email}"
+                except JWTError:
+                    pass
+        client = scope.get("client")
+        return f"ip:{client[0]}" if client else "ip:unknown"
+
+    async def _reject(self, send, status_code: int, detail: str, retry_after: int = None):
+        body = json.dumps({"detail": detail}).encode()
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        if retry_after is not None:
+            headers.append((b"retry-after", str(retry_after).encode()))
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
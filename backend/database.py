@@ -1,4 +1,6 @@
 import os
+import asyncio
+import time
 import certifi
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
@@ -6,12 +8,24 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+HEARTBEAT_INTERVAL_SECONDS = float(os.getenv("MONGODB_HEARTBEAT_INTERVAL", 10))
+HEARTBEAT_TIMEOUT_SECONDS = float(os.getenv("MONGODB_HEARTBEAT_TIMEOUT", 5))
+MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", 5))
+
 class Database:
     client: AsyncIOMotorClient = None
     database = None
 
+class DatabaseState:
+    """Connection state cached by the heartbeat task"""
+    connected: bool = False
+    round_trip_ms: float = None
+    last_checked: float = None
+    error: str = None
+
 # Database instance
 db = Database()
+db_state = DatabaseState()
 
 async def get_database() -> AsyncIOMotorClient:
     """Get database instance"""
@@ -21,21 +35,70 @@ async def connect_to_mongo():
     """Create database connection"""
     try:
         ca = certifi.where()
-        db.client = AsyncIOMotorClient(os.getenv("MONGODB_URL"), tlsCAFile=ca)
+        db.client = AsyncIOMotorClient(os.getenv("MONGODB_URL"), tlsCAFile=ca, minPoolSize=MIN_POOL_SIZE)
         db.database = db.client[os.getenv("DATABASE_NAME", "snapdev_portal")]
         
         # Test the connection
-        await db.client.admin.command('ping')
+        await ping_database()
+        if not db_state.connected:
+            raise ConnectionError(db_state.error)
         print("✅ Successfully connected to MongoDB Atlas!")
+
+        await warm_up_pool()
         
     except Exception as e:
         print(f"❌ Error connecting to MongoDB: {e}")
         raise e
 
+async def warm_up_pool(size: int = MIN_POOL_SIZE):
+    """Open pool connections up front so the first requests don't pay connection setup"""
+    if not db.client or size <= 0:
+        return
+    results = await asyncio.gather(
+        *(db.client.admin.command('ping') for _ in range(size)),
+        return_exceptions=True
+    )
+    warmed = sum(1 for result in results if not isinstance(result, Exception))
+    print(f"🔥 Warmed up MongoDB pool with {warmed}/{size} connections")
+
+async def ping_database():
+    """Ping MongoDB once and update the cached connection state"""
+    db_state.last_checked = time.time()
+    if not db.client:
+        db_state.connected = False
+        db_state.round_trip_ms = None
+        db_state.error = "Database client not initialized"
+        return db_state
+
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(db.client.admin.command('ping'), timeout=HEARTBEAT_TIMEOUT_SECONDS)
+        db_state.connected = True
+        db_state.round_trip_ms = round((time.perf_counter() - started) * 1000, 2)
+        db_state.error = None
+    except Exception as e:
+        db_state.connected = False
+        db_state.round_trip_ms = None
+        db_state.error = str(e) or e.__class__.__name__
+    return db_state
+
+async def run_heartbeat(interval: float = HEARTBEAT_INTERVAL_SECONDS):
+    """Background task that keeps db_state up to date"""
+    while True:
+        was_connected = db_state.connected
+        await ping_database()
+        if was_connected != db_state.connected:
+            if db_state.connected:
+                print("✅ MongoDB connection restored")
+            else:
+                print(f"❌ MongoDB heartbeat failed: {db_state.error}")
+        await asyncio.sleep(interval)
+
 async def close_mongo_connection():
     """Close database connection"""
     if db.client:
         db.client.close()
+        db_state.connected = False
         print("🔌 Disconnected from MongoDB")
 
 # Collections
@@ -0,0 +1,581 @@
+#!/usr/bin/env python3
+"""
+Load-testing harness for the SnapDev Portal FastAPI Backend
+
+Drives the app from main.py with scripted scenarios and reports throughput,
+p50/p95/p99 latency and event-loop lag per endpoint.
+
+By default the app runs in process over an ASGI transport, with an in-memory
+MongoDB stand-in and a fake gspread backend, so no external services are needed:
+
+    python3 loadtest.py
+    python3 loadtest.py --mode uvicorn --concurrency 20 --requests 500
+    python3 loadtest.py --admission on   # include admission control (off by default)
+    python3 loadtest.py --url http://localhost:8000 --email admin@gmail.com --password ...
+
+With --url the fakes are not installed and the target server uses its own
+database and Google Sheets credentials.
+"""
+
+import argparse
+import asyncio
+import copy
+import io
+import json
+import math
+import os
+import random
+import socket
+import time
+from datetime import datetime, timedelta
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+SCENARIOS = ["login_burst", "me_polling", "uploads", "sheet_reads"]
+
+LOADTEST_EMAIL = "loadtest-admin@example.com"
+LOADTEST_PASSWORD = "loadtest-password"
+
+ENGINEERS = ["Ali Khan", "Sara Ahmed", "Bilal Raza", "Hina Tariq", "Usman Ali", "Ayesha Noor"]
+CLIENTS = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark"]
+
+
+# ---------------------------------------------------------------------------
+# Local MongoDB stand-in
+# ---------------------------------------------------------------------------
+
+def _matches(document, query):
+    for key, condition in query.items():
+        value = document.get(key)
+        if isinstance(condition, dict) and "$in" in condition:
+            if value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeInsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class FakeInsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length=None):
+        return self.documents if length is None else self.documents[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+
+class FakeCollection:
+    """Just enough of the Motor collection API for the routes in this app"""
+
+    def __init__(self, latency=0.0):
+        self.documents = []
+        self.latency = latency
+
+    async def _round_trip(self):
+        await asyncio.sleep(self.latency)
+
+    async def find_one(self, query):
+        await self._round_trip()
+        for document in self.documents:
+            if _matches(document, query):
+                return copy.deepcopy(document)
+        return None
+
+    def find(self, query=None, projection=None):
+        return FakeCursor([copy.deepcopy(d) for d in self.documents if _matches(d, query or {})])
+
+    async def insert_one(self, document):
+        await self._round_trip()
+        document = dict(document)
+        document.setdefault("_id", os.urandom(12).hex())
+        self.documents.append(document)
+        return FakeInsertOneResult(document["_id"])
+
+    async def insert_many(self, documents, ordered=True):
+        await self._round_trip()
+        inserted_ids = []
+        for document in documents:
+            document = dict(document)
+            document.setdefault("_id", os.urandom(12).hex())
+            self.documents.append(document)
+            inserted_ids.append(document["_id"])
+        return FakeInsertManyResult(inserted_ids)
+
+
+class FakeDatabase:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(self.latency)
+        return self.collections[name]
+
+    async def command(self, command):
+        await asyncio.sleep(self.latency)
+        return {"ok": 1.0}
+
+
+class FakeMongoClient:
+    def __init__(self, latency=0.0):
+        self.admin = FakeDatabase(latency)
+
+    def close(self):
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Fake gspread backend
+# ---------------------------------------------------------------------------
+
+class FakeWorksheet:
+    def __init__(self, records, latency):
+        self.records = records
+        self.latency = latency
+
+    def get_all_records(self):
+        time.sleep(self.latency)
+        return [dict(record) for record in self.records]
+
+
+class FakeSpreadsheet:
+    def __init__(self, spreadsheet_id, rows, latency):
+        self.spreadsheet_id = spreadsheet_id
+        self.rows = rows
+        self.latency = latency
+        self.worksheets = {}
+
+    def worksheet(self, name):
+        time.sleep(self.latency)
+        if name not in self.worksheets:
+            seed = f"{self.spreadsheet_id}:{name}"
+            self.worksheets[name] = FakeWorksheet(generate_hours_records(self.rows, seed), self.latency)
+        return self.worksheets[name]
+
+
+class FakeGspreadClient:
+    """Serves generated client-hours rows for any spreadsheet and worksheet"""
+
+    def __init__(self, rows=200, latency=0.05):
+        self.rows = rows
+        self.latency = latency
+        self.spreadsheets = {}
+
+    def open_by_key(self, spreadsheet_id):
+        time.sleep(self.latency)
+        if spreadsheet_id not in self.spreadsheets:
+            self.spreadsheets[spreadsheet_id] = FakeSpreadsheet(spreadsheet_id, self.rows, self.latency)
+        return self.spreadsheets[spreadsheet_id]
+
+
+# ---------------------------------------------------------------------------
+# Payload generation
+# ---------------------------------------------------------------------------
+
+def generate_hours_records(rows, seed=None):
+    rng = random.Random(seed)
+    records = []
+    for _ in range(rows):
+        start = datetime(2024, 1, 1, rng.randint(0, 23), rng.choice([0, 15, 30, 45]))
+        end = start + timedelta(minutes=rng.randint(15, 240))
+        records.append({
+            "Client Name": rng.choice(CLIENTS),
+            "Start Time (PKT)": start.strftime("%I:%M:%S %p"),
+            "End Time (PKT)": end.strftime("%I:%M:%S %p"),
+            "Engineer Name": rng.choice(ENGINEERS),
+            "Date": f"2024-01-{rng.randint(1, 28):02d}",
+        })
+    return records
+
+
+def generate_hours_csv(rows, seed=None):
+    records = generate_hours_records(rows, seed)
+    output = io.StringIO()
+    output.write(",".join(records[0].keys()) + "\n")
+    for record in records:
+        output.write(",".join(str(value) for value in record.values()) + "\n")
+    return output.getvalue().encode("utf-8")
+
+
+def generate_salary_csv(rows, seed=None):
+    rng = random.Random(seed)
+    output = io.StringIO()
+    output.write("workers,start_time,end_time\n")
+    for _ in range(rows):
+        start = datetime(2024, 1, rng.randint(1, 28), rng.randint(0, 23), rng.randint(0, 59))
+        end = start + timedelta(minutes=rng.randint(30, 600))
+        output.write(f"{rng.choice(ENGINEERS)},{start.isoformat()}+05:00,{end.isoformat()}+05:00\n")
+    return output.getvalue().encode("utf-8")
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize_latencies(latencies_ms):
+    values = sorted(latencies_ms)
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None, "mean_ms": None}
+    return {
+        "p50_ms": round(percentile(values, 50), 2),
+        "p95_ms": round(percentile(values, 95), 2),
+        "p99_ms": round(percentile(values, 99), 2),
+        "max_ms": round(values[-1], 2),
+        "mean_ms": round(sum(values) / len(values), 2),
+    }
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up a coroutine that sleeps for a fixed interval"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.lags_ms = []
+        self._expected = None
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags_ms.append(max(0.0, (loop.time() - self._expected) * 1000))
+
+    def start(self):
+        self.lags_ms = []
+        self._expected = asyncio.get_running_loop().time() + self.interval
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # A scenario that blocks the loop throughout never lets the sleep finish, count the pending one too
+        overdue = asyncio.get_running_loop().time() - self._expected
+        if overdue > 0:
+            self.lags_ms.append(overdue * 1000)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        return summarize_latencies(self.lags_ms)
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies_ms = []
+        self.status_codes = {}
+        self.errors = 0
+
+    def record(self, latency_ms, status_code=None, error=None):
+        self.latencies_ms.append(latency_ms)
+        if error is not None or status_code is None or status_code >= 400:
+            self.errors += 1
+        key = str(status_code) if status_code is not None else type(error).__name__
+        self.status_codes[key] = self.status_codes.get(key, 0) + 1
+
+
+class Recorder:
+    def __init__(self):
+        self.endpoints = {}
+
+    async def request(self, client, method, path, name=None, **kwargs):
+        stats = self.endpoints.setdefault(name or f"{method} {path}", EndpointStats())
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except Exception as e:
+            stats.record((time.perf_counter() - started) * 1000, error=e)
+            return None
+        stats.record((time.perf_counter() - started) * 1000, status_code=response.status_code)
+        return response
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+
+async def run_workers(total, concurrency, job):
+    """Run job(i) for i in range(total) with at most `concurrency` in flight"""
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker():
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await job(i)
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+
+
+async def login(client, recorder, email, password):
+    response = await recorder.request(
+        client, "POST", "/api/auth/login",
+        data={"username": email, "password": password},
+    )
+    if response is None or response.status_code != 200:
+        return None
+    return response.json()["access_token"]
+
+
+async def auth_headers(client, options):
+    """Bearer header for the load-test admin, fetched once before any scenario is timed"""
+    token = await login(client, Recorder(), options.email, options.password)
+    if token is None:
+        raise RuntimeError("Could not log in as the load-test admin, check --email/--password")
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def scenario_login_burst(client, recorder, options, headers):
+    async def job(i):
+        await login(client, recorder, options.email, options.password)
+    await run_workers(options.requests, options.concurrency, job)
+
+
+async def scenario_me_polling(client, recorder, options, headers):
+    async def job(i):
+        await recorder.request(client, "GET", "/api/auth/me", headers=headers)
+    await run_workers(options.requests, options.concurrency, job)
+
+
+async def scenario_uploads(client, recorder, options, headers):
+    hours_csv = generate_hours_csv(options.rows, seed="hours")
+    salary_csv = generate_salary_csv(options.rows, seed="salary")
+
+    async def job(i):
+        if i % 2 == 0:
+            await recorder.request(
+                client, "POST", "/api/hours/upload",
+                files={"file": ("hours.csv", hours_csv, "text/csv")}, headers=headers,
+            )
+        else:
+            await recorder.request(
+                client, "POST", "/api/salary/calculate-salary",
+                files={"file": ("salary.csv", salary_csv, "text/csv")}, headers=headers,
+            )
+    await run_workers(options.requests, options.concurrency, job)
+
+
+async def scenario_sheet_reads(client, recorder, options, headers):
+    params = [("targets", target) for target in options.sheet_targets]
+
+    async def job(i):
+        if i % 2 == 0:
+            await recorder.request(client, "GET", "/api/sheets/client-hours", params=params, headers=headers)
+        else:
+            await recorder.request(client, "GET", "/api/sheets/sheet-data", params=params, headers=headers)
+    await run_workers(options.requests, options.concurrency, job)
+
+
+SCENARIO_RUNNERS = {
+    "login_burst": scenario_login_burst,
+    "me_polling": scenario_me_polling,
+    "uploads": scenario_uploads,
+    "sheet_reads": scenario_sheet_reads,
+}
+
+
+# ---------------------------------------------------------------------------
+# Harness
+# ---------------------------------------------------------------------------
+
+async def install_fakes(options):
+    """Point the app at the in-memory MongoDB stand-in and the fake gspread backend"""
+    import database
+    from routes import sheets
+    from routes.auth import get_password_hash
+    from models import User, UserType
+
+    database.db.client = FakeMongoClient(options.db_latency)
+    database.db.database = FakeDatabase(options.db_latency)
+    await database.ping_database()
+
+    admin = User(
+        email=options.email,
+        full_name="Load Test Admin",
+        hashed_password=get_password_hash(options.password),
+        user_type=UserType.ADMIN,
+    )
+    await database.get_users_collection().insert_one(admin.dict(by_alias=True))
+
+    fake_client = FakeGspreadClient(rows=options.rows, latency=options.sheets_latency)
+    sheets.get_gspread_client = lambda: fake_client
+    os.environ.setdefault("GOOGLE_SPREADSHEET_ID", "loadtest-spreadsheet")
+
+
+def find_free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start_local_uvicorn(app):
+    import uvicorn
+
+    port = find_free_port()
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", log_level="warning")
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.05)
+    return server, task, f"http://127.0.0.1:{port}"
+
+
+async def run(options):
+    if httpx is None:
+        raise SystemExit("httpx is required for the load-test harness: pip3 install httpx")
+
+    server = server_task = None
+    if options.url:
+        base_url = options.url.rstrip("/")
+        transport = None
+    else:
+        # Read by admission.py when main.py is imported. Off by default so the handlers themselves are
+        # measured, on to see the 429/503 load shedding (results then count them as errors).
+        os.environ["ADMISSION_ENABLED"] = "True" if options.admission == "on" else "False"
+        await install_fakes(options)
+        from main import app
+        if options.mode == "uvicorn":
+            server, server_task, base_url = await start_local_uvicorn(app)
+            transport = None
+        else:
+            base_url = "http://loadtest"
+            transport = httpx.ASGITransport(app=app)
+
+    limits = httpx.Limits(max_connections=options.concurrency, max_keepalive_connections=options.concurrency)
+    results = {
+        "target": base_url if options.url else options.mode,
+        "started_at": datetime.utcnow().isoformat() + "Z",
+        "options": {
+            "concurrency": options.concurrency,
+            "requests": options.requests,
+            "rows": options.rows,
+            "sheet_targets": options.sheet_targets,
+        },
+        "scenarios": {},
+    }
+
+    try:
+        async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=options.timeout) as client:
+            # Log in before the clock and lag monitor start, so the bcrypt verify is not measured
+            headers = await auth_headers(client, options)
+            for name in options.scenarios:
+                print(f"🏃 Running scenario: {name}")
+                recorder = Recorder()
+                monitor = LoopLagMonitor()
+                monitor.start()
+                started = time.perf_counter()
+                try:
+                    await SCENARIO_RUNNERS[name](client, recorder, options, headers)
+                finally:
+                    elapsed = time.perf_counter() - started
+                    loop_lag = await monitor.stop()
+                results["scenarios"][name] = build_scenario_report(recorder, elapsed, loop_lag)
+    finally:
+        if server is not None:
+            server.should_exit = True
+            await server_task
+
+    return results
+
+
+def build_scenario_report(recorder, elapsed, loop_lag):
+    endpoints = {}
+    for endpoint, stats in recorder.endpoints.items():
+        endpoints[endpoint] = {
+            "requests": len(stats.latencies_ms),
+            "errors": stats.errors,
+            "throughput_rps": round(len(stats.latencies_ms) / elapsed, 2) if elapsed else None,
+            "status_codes": stats.status_codes,
+            **summarize_latencies(stats.latencies_ms),
+        }
+    return {
+        "duration_s": round(elapsed, 3),
+        "event_loop_lag": loop_lag,
+        "endpoints": endpoints,
+    }
+
+
+def print_report(results):
+    header = f"{'endpoint':<36} {'reqs':>6} {'errs':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    for name, scenario in results["scenarios"].items():
+        lag = scenario["event_loop_lag"]
+        print(f"\n📊 {name} ({scenario['duration_s']}s, loop lag p50 {lag['p50_ms']}ms / p99 {lag['p99_ms']}ms / max {lag['max_ms']}ms)")
+        print(header)
+        for endpoint, stats in scenario["endpoints"].items():
+            print(
+                f"{endpoint:<36} {stats['requests']:>6} {stats['errors']:>5} {stats['throughput_rps']:>8} "
+                f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}"
+            )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the SnapDev Portal API")
+    parser.add_argument("--mode", choices=["asgi", "uvicorn"], default="asgi",
+                        help="Run the app in process over ASGI, or behind a local uvicorn server")
+    parser.add_argument("--url", help="Load-test an already running server instead of the in-process app")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=10, help="Requests in flight per scenario")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--rows", type=int, default=500, help="Rows per generated CSV upload and fake worksheet")
+    parser.add_argument("--sheet-targets", nargs="+", default=["loadtest-a:January", "loadtest-a:February", "loadtest-b:January"],
+                        help="SPREADSHEET_ID:Worksheet targets for the sheet scenario")
+    parser.add_argument("--admission", choices=["on", "off"], default="off",
+                        help="Admission control for the in-process app (a --url server uses its own ADMISSION_ENABLED)")
+    parser.add_argument("--db-latency", type=float, default=0.002, help="Simulated MongoDB round trip in seconds")
+    parser.add_argument("--sheets-latency", type=float, default=0.05, help="Simulated Google Sheets round trip in seconds")
+    parser.add_argument("--email", default=os.getenv("LOADTEST_EMAIL", LOADTEST_EMAIL))
+    parser.add_argument("--password", default=os.getenv("LOADTEST_PASSWORD", LOADTEST_PASSWORD))
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--output", default="loadtest_results.json", help="Where to save the JSON results")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    results = asyncio.run(run(options))
+    print_report(results)
+    with open(options.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results saved to {options.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta
+import pandas as pd
+
+REQUIRED_COLUMNS = ["Client Name", "Start Time (PKT)", "End Time (PKT)", "Engineer Name", "Date"]
+TIME_FORMATS = ["%I:%M:%S %p", "%H:%M:%S", "%I:%M %p", "%H:%M"]
+
+
+def normalize_columns(df):
+    """Rename columns to the standard names (case-insensitive) and return the missing ones"""
+    column_mapping = {}
+    for req_col in REQUIRED_COLUMNS:
+        for df_col in df.columns:
+            if req_col.lower().strip() == str(df_col).lower().strip():
+                column_mapping[df_col] = req_col
+                break
+
+    df = df.rename(columns=column_mapping)
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    return df, missing_columns
+
+
+def frame_from_records(records):
+    """Build a normalized DataFrame from row dicts (e.g. gspread records) and return the missing columns"""
+    return normalize_columns(pd.DataFrame(records))
+
+
+def calculate_minutes(start_time_str, end_time_str, time_formats=TIME_FORMATS):
+    """Duration in minutes between two time strings, handling overnight shifts. Returns 0 if unparseable."""
+    start_time_str = str(start_time_str).strip()
+    end_time_str = str(end_time_str).strip()
+
+    start_time = None
+    end_time = None
+    for fmt in time_formats:
+        try:
+            start_time = datetime.strptime(start_time_str, fmt)
+            end_time = datetime.strptime(end_time_str, fmt)
+            break
+        except ValueError:
+            continue
+
+    if start_time is None or end_time is None:
+        return 0
+
+    # Handle overnight shift
+    if end_time < start_time:
+        end_time += timedelta(days=1)
+
+    return int((end_time - start_time).seconds / 60)
+
+
+def minutes_to_hhmm(minutes):
+    hours, mins = divmod(int(minutes), 60)
+    return f"{hours:02}:{mins:02}"
+
+
+def add_minutes_column(df, time_formats=TIME_FORMATS):
+    df["Minutes"] = pd.Series(
+        [
+            calculate_minutes(start, end, time_formats)
+            for start, end in zip(df["Start Time (PKT)"], df["End Time (PKT)"])
+        ],
+        index=df.index,
+        dtype="int32",
+    )
+    return df
+
+
+def prepare_client_hours(df, time_formats=TIME_FORMATS):
+    """Compact frame used by the reports: categorical client, engineer and date columns plus integer minutes"""
+    # Rows without a client name are left out of the report (astype(str) would turn them into a "Nan" client)
+    df = add_minutes_column(df[df["Client Name"].notna()].copy(), time_formats)
+    return pd.DataFrame({
+        # Normalize client names (case-insensitive)
+        "Client Name": df["Client Name"].astype(str).str.strip().str.title().astype("category"),
+        "Engineer Name": df["Engineer Name"].astype(str).str.strip().astype("category"),
+        "Date": df["Date"].astype(str).astype("category"),
+        "Minutes": df["Minutes"],
+    })
+
+
+def client_totals(frame):
+    """Total minutes per client, sorted descending"""
+    totals = frame.groupby("Client Name", observed=True)["Minutes"].sum()
+    return totals.sort_values(ascending=False)
+
+
+def _page(items, offset=0, limit=None):
+    return items[offset:] if limit is None else items[offset:offset + limit]
+
+
+def build_string_report(frame, offset=0, limit=None):
+    """Legacy report: one "Engineer (HH:MM) on Date || ..." breakdown string per client"""
+    totals = _page(client_totals(frame), offset, limit)
+    if totals.empty:
+        return []
+
+    # Only build breakdown strings for the clients on this page
+    rows = frame[frame["Client Name"].isin(totals.index)]
+    breakdown = (
+        rows["Engineer Name"].astype(str) +
+        " (" + rows["Minutes"].apply(minutes_to_hhmm) + ")" +
+        " on " + rows["Date"].astype(str)
+    )
+    joined = breakdown.groupby(rows["Client Name"], observed=True).agg(" || ".join)
+
+    return [
+        {
+            "Client Name": client,
+            "Total Hours Used": minutes_to_hhmm(total),
+            "Breakdown": joined[client],
+        }
+        for client, total in totals.items()
+    ]
+
+
+def build_structured_report(frame, subtotals=False, max_entries=None, offset=0, limit=None):
+    """Structured report: per-client arrays of [engineer, minutes, date] entries.
+
+    max_entries truncates the entries of each client, offset/limit paginate over clients.
+    """
+    all_totals = client_totals(frame)
+    totals = _page(all_totals, offset, limit)
+
+    grouped_positions = frame.groupby("Client Name", observed=True).indices
+    engineer_codes = frame["Engineer Name"].cat.codes.to_numpy()
+    engineers = frame["Engineer Name"].cat.categories
+    date_codes = frame["Date"].cat.codes.to_numpy()
+    dates = frame["Date"].cat.categories
+    minutes = frame["Minutes"].to_numpy()
+
+    engineer_subtotals = None
+    if subtotals:
+        engineer_subtotals = frame.groupby(["Client Name", "Engineer Name"], observed=True)["Minutes"].sum()
+
+    clients = []
+    for client, total in totals.items():
+        positions = grouped_positions[client]
+        shown = positions if max_entries is None else positions[:max_entries]
+        entry = {
+            "Client Name": client,
+            "Total Hours Used": minutes_to_hhmm(total),
+            "Total Minutes": int(total),
+            "Entry Count": len(positions),
+            "Entries": [
+                [engineers[engineer_codes[i]], int(minutes[i]), dates[date_codes[i]]]
+                for i in shown
+            ],
+            "Truncated": len(shown) < len(positions),
+        }
+        if engineer_subtotals is not None:
+            entry["Engineer Subtotals"] = [
+                [engineer, int(engineer_minutes)]
+                for engineer, engineer_minutes in engineer_subtotals.loc[client].sort_values(ascending=False).items()
+            ]
+        clients.append(entry)
+
+    return {
+        "Entry Fields": ["Engineer Name", "Minutes", "Date"],
+        "Total Clients": len(all_totals),
+        "Offset": offset,
+        "Limit": limit,
+        "Clients": clients,
+    }
+
+
+def build_report(frame, breakdown="string", subtotals=False, max_entries=None, offset=0, limit=None):
+    """Client-hours report in the requested breakdown format ("string" or "structured")"""
+    if frame is None:
+        frame = prepare_client_hours(pd.DataFrame(columns=REQUIRED_COLUMNS))
+    if breakdown == "structured":
+        return build_structured_report(frame, subtotals, max_entries, offset, limit)
+    return build_string_report(frame, offset, limit)
+
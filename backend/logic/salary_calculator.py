@@ -75,7 +75,7 @@ class SalaryCalculator:
                 cur = seg_end
 
         rows = []
-        for worker, d in sorted(workers.items(), key=lambda item: item.lower()):
+        for worker, d in sorted(workers.items(), key=lambda item: item[0].lower()):
             am_sec = Decimal(d["am_seconds"])
             pm_sec = Decimal(d["pm_seconds"])
             total_sec = am_sec + pm_sec
@@ -1,11 +1,15 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
-import os
+import asyncio
 from dotenv import load_dotenv
 
-from database import connect_to_mongo, close_mongo_connection, get_database
-from routes import auth, hours, sheets, salary
+from database import connect_to_mongo, close_mongo_connection, run_heartbeat, db_state
+from profiling import ProfilingMiddleware, PROFILING_ENABLED
+from admission import AdmissionControlMiddleware, ADMISSION_ENABLED
+from routes import auth, hours, sheets, salary, profiles
+from routes.auth import shutdown_hash_executor
 
 # Load environment variables
 load_dotenv()
@@ -18,8 +22,15 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"Warning: Could not connect to MongoDB: {e}")
         print("Server will start without database connection")
+    heartbeat_task = asyncio.create_task(run_heartbeat())
     yield
     # Shutdown
+    heartbeat_task.cancel()
+    try:
+        await heartbeat_task
+    except asyncio.CancelledError:
+        pass
+    shutdown_hash_executor()
     try:
         await close_mongo_connection()
     except Exception as e:
@@ -33,6 +44,10 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Admission control for the heavy upload/report routes (inside CORS so rejections keep CORS headers)
+if ADMISSION_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -42,11 +57,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in per-request profiling for admins (X-Profile header or ?profile=)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Admin Authentication"])
 app.include_router(hours.router, prefix="/api/hours", tags=["Client Hours"])
 app.include_router(sheets.router, prefix="/api/sheets", tags=["Google Sheets"])
 app.include_router(salary.router, prefix="/api/salary", tags=["Salary Calculator"])
+app.include_router(profiles.router, prefix="/api/profiles", tags=["Profiling"])
 
 @app.get("/")
 async def root():
@@ -58,36 +78,44 @@ async def root():
         "access": "admin_only"
     }
 
+def database_status():
+    return {
+        "database": "connected" if db_state.connected else "disconnected",
+        "round_trip_ms": db_state.round_trip_ms,
+        "last_checked": db_state.last_checked,
+    }
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    try:
-        db = await get_database()
-        # Test database connection
-        await db.command('ping')
+    """Health check endpoint (uses the cached database heartbeat)"""
+    if db_state.connected:
         return {
             "status": "healthy",
-            "database": "connected",
+            **database_status(),
             "message": "All systems operational"
         }
-    except Exception as e:
-        return {
-            "status": "healthy",
-            "database": "disconnected",
-            "message": f"Server running but database unavailable: {str(e)}"
-        }
+    return {
+        "status": "degraded",
+        **database_status(),
+        "message": f"Server running but database unavailable: {db_state.error}"
+    }
+
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: returns 503 while the cached heartbeat reports the database down"""
+    if not db_state.connected:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "not_ready", **database_status(), "error": db_state.error}
+        )
+    return {"status": "ready", **database_status()}
 
 if __name__ == "__main__":
-    import uvicorn
-    
-    host = os.getenv("HOST", "0.0.0.0")
-    port = int(os.getenv("PORT", 8000))
-    debug = os.getenv("DEBUG", "True").lower() == "true"
-    
-    uvicorn.run(
-        "main:app",
-        host=host,
-        port=port,
-        reload=debug,
-        log_level="info"
-    )
\ No newline at end of file
+    from start import main
+
+    main()
@@ -0,0 +1,316 @@
+import os
+import sys
+import io
+import asyncio
+import time
+import uuid
+import cProfile
+import pstats
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from urllib.parse import parse_qs
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "True").lower() == "true"
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.001))
+PROFILE_HISTORY = int(os.getenv("PROFILE_HISTORY", 20))
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_PARAM = "profile"
+PROFILE_MODES = ("sample", "cprofile")
+
+# Profiles of the last PROFILE_HISTORY profiled requests (process-local)
+profiles = deque(maxlen=PROFILE_HISTORY)
+
+# Stage timings of the request being profiled, None when profiling is off
+_current_stages: ContextVar = ContextVar("profile_stages", default=None)
+
+# Profiler of the request being profiled, used by run_in_thread
+_current_profiler: ContextVar = ContextVar("profiler", default=None)
+
+# Only one request is profiled at a time so samples/stats are not mixed up
+_profile_lock = threading.Lock()
+
+
+@contextmanager
+def profile_stage(name: str):
+    """Record how long a block took when the current request is being profiled"""
+    stages = _current_stages.get()
+    if stages is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages.append({"name": name, "duration_ms": round((time.perf_counter() - started) * 1000, 3)})
+
+
+async def run_in_thread(func, *args):
+    """asyncio.to_thread that also profiles func when the current request is profiled with cProfile"""
+    profiler = _current_profiler.get()
+    if isinstance(profiler, DeterministicProfiler):
+        return await asyncio.to_thread(profiler.run_profiled, func, *args)
+    return await asyncio.to_thread(func, *args)
+
+
+def get_profile(profile_id: str):
+    for profile in profiles:
+        if profile["id"] == profile_id:
+            return profile
+    return None
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+# Leaf frames of threads that are waiting for work (idle executor/monitor threads)
+IDLE_FRAMES = {
+    ("thread.py", "_worker"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+}
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads from a background thread.
+
+    The event loop thread is always sampled, other threads (asyncio.to_thread workers,
+    Motor's executor) only while they are not idle. Each stack starts with the thread name.
+    The result is in folded/collapsed format ("root;child;leaf count" per line), which
+    flamegraph.pl, speedscope and similar tools read directly. Everything running while the
+    request is in flight is sampled, including other concurrent requests.
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _is_idle(self, frame):
+        code = frame.f_code
+        return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self._thread.ident:
+                    continue
+                if thread_id != self.thread_id and self._is_idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, f"thread-{thread_id}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class DeterministicProfiler:
+    """cProfile around the request, reported as pstats text sorted by cumulative time.
+
+    cProfile only sees the thread it was enabled on, so work handed to run_in_thread is
+    profiled in the worker thread and merged into the report.
+    """
+
+    def __init__(self, limit: int = 50):
+        self.limit = limit
+        self.profiler = cProfile.Profile()
+        self.thread_profilers = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+
+    def run_profiled(self, func, *args):
+        thread_profiler = cProfile.Profile()
+        try:
+            thread_profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler, which already covers every thread
+            return func(*args)
+        try:
+            return func(*args)
+        finally:
+            thread_profiler.disable()
+            with self._lock:
+                self.thread_profilers.append(thread_profiler)
+
+    def stats(self):
+        output = io.StringIO()
+        with self._lock:
+            thread_profilers = list(self.thread_profilers)
+        stats = pstats.Stats(self.profiler, *thread_profilers, stream=output)
+        stats.sort_stats("cumulative").print_stats(self.limit)
+        return output.getvalue()
+
+
+class ProfilingMiddleware:
+    """Opt-in per-request profiling for admins.
+
+    A request is profiled when it sends an "X-Profile: sample|cprofile" header or a
+    "?profile=sample|cprofile" query parameter together with a valid admin bearer token.
+    The profile is stored in memory (and in PROFILE_DIR when set) and its id is returned
+    in the "X-Profile-Id" response header, see GET /api/profiles/{profile_id}.
+    Requests that don't ask for a profile go straight to the app.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = self._requested_mode(scope)
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        admin = await self._authorize(scope)
+        if admin is None:
+            await self.app(scope, receive, self._with_headers(send, [(b"x-profile", b"denied")]))
+            return
+
+        if not _profile_lock.acquire(blocking=False):
+            await self.app(scope, receive, self._with_headers(send, [(b"x-profile", b"busy")]))
+            return
+
+        try:
+            await self._profile(scope, receive, send, mode, admin)
+        finally:
+            _profile_lock.release()
+
+    def _requested_mode(self, scope):
+        value = None
+        for name, header_value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                value = header_value.decode("latin-1")
+                break
+        if value is None and PROFILE_QUERY_PARAM.encode() in scope.get("query_string", b""):
+            values = parse_qs(scope["query_string"].decode("latin-1")).get(PROFILE_QUERY_PARAM)
+            value = values[0] if values else None
+        if value is None:
+            return None
+        value = value.strip().lower()
+        if value in ("1", "true", ""):
+            return "sample"
+        return value if value in PROFILE_MODES else None
+
+    async def _authorize(self, scope):
+        # Imported here, routes import this module for profile_stage
+        from fastapi import HTTPException
+        from routes.auth import get_current_admin
+
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() != "bearer" or not token:
+                    return None
+                try:
+                    return await get_current_admin(token)
+                except HTTPException:
+                    return None
+        return None
+
+    def _with_headers(self, send, headers):
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+        return send_with_headers
+
+    async def _profile(self, scope, receive, send, mode, admin):
+        profile_id = uuid.uuid4().hex
+        stages = []
+        status = {}
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile", mode.encode()),
+                    (b"x-profile-id", profile_id.encode()),
+                ]
+            await send(message)
+
+        if mode == "cprofile":
+            profiler = DeterministicProfiler()
+        else:
+            profiler = SamplingProfiler(threading.get_ident())
+
+        token = _current_stages.set(stages)
+        profiler_token = _current_profiler.set(profiler)
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            profiler.stop()
+            duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            _current_stages.reset(token)
+            _current_profiler.reset(profiler_token)
+
+            profile = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "mode": mode,
+                "admin": admin.email,
+                "started_at": started_at.isoformat() + "Z",
+                "duration_ms": duration_ms,
+                "status_code": status.get("code"),
+                "stages": stages,
+            }
+            if mode == "cprofile":
+                profile["stats"] = profiler.stats()
+            else:
+                profile["samples"] = profiler.samples
+                profile["sample_interval_ms"] = profiler.interval * 1000
+                profile["folded"] = profiler.folded()
+            profiles.append(profile)
+            self._save(profile)
+            print(f"🔬 Profiled {scope['method']} {scope['path']} ({mode}) in {duration_ms}ms: {profile_id}")
+
+    def _save(self, profile):
+        if not PROFILE_DIR:
+            return
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            extension = "prof.txt" if profile["mode"] == "cprofile" else "folded"
+            content = profile["stats"] if profile["mode"] == "cprofile" else profile["folded"]
+            with open(os.path.join(PROFILE_DIR, f"{profile['id']}.{extension}"), "w") as f:
+                f.write(content)
+        except OSError as e:
+            print(f"Warning: Could not save profile {profile['id']}: {e}")
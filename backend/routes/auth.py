@@ -1,13 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, ValidationError
 from passlib.context import CryptContext
 from jose import JWTError, jwt
+from pymongo.errors import BulkWriteError
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
 from datetime import datetime, timedelta
+import asyncio
+import csv
+import io
+import json
 import os
-from typing import Optional
+import time
+from typing import List, Optional
 
 from database import get_users_collection
+from profiling import profile_stage
+from system import cpu_count
 from models import User, UserCreate, UserResponse
 
 router = APIRouter()
@@ -20,6 +31,16 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
+# Bulk user import
+BULK_IMPORT_MAX_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", 1000))
+CSV_EXTRA_FIELDS = "_extra_fields"
+# Each uvicorn worker has its own pool, so WEB_CONCURRENCY workers start up to
+# WEB_CONCURRENCY x PASSWORD_HASH_WORKERS hashing processes
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", cpu_count()))
+
+# Process pool for bcrypt hashing, created on first bulk import
+_hash_executor: Optional[ProcessPoolExecutor] = None
+
 # Pydantic models
 class AdminLogin(BaseModel):
     email: EmailStr
@@ -40,6 +61,48 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+def get_password_hashes(passwords: List[str]) -> List[str]:
+    return [pwd_context.hash(password) for password in passwords]
+
+def get_hash_executor() -> ProcessPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        # spawn, forking a process that runs the event loop and driver threads is unsafe
+        _hash_executor = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _hash_executor
+
+def shutdown_hash_executor():
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(cancel_futures=True)
+        _hash_executor = None
+
+async def hash_passwords_parallel(passwords: List[str]) -> List[str]:
+    """Hash passwords across the process pool, one chunk per worker"""
+    if not passwords:
+        return []
+    workers = min(PASSWORD_HASH_WORKERS, len(passwords))
+    chunk_size = -(-len(passwords) // workers)
+    chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+
+    loop = asyncio.get_running_loop()
+    executor = get_hash_executor()
+    try:
+        hashed_chunks = await asyncio.gather(
+            *(loop.run_in_executor(executor, get_password_hashes, chunk) for chunk in chunks)
+        )
+    except BrokenProcessPool as e:
+        # A worker died, start a fresh pool on the next import
+        shutdown_hash_executor()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Password hashing failed, please retry the import: {e}"
+        )
+    return [hashed for chunk in hashed_chunks for hashed in chunk]
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -54,14 +117,17 @@ from models import UserType
 
 async def get_admin_by_email(email: str):
     users_collection = get_users_collection()
-    admin = await users_collection.find_one({"email": email, "user_type": UserType.ADMIN})
+    with profile_stage("mongo.users.find_one"):
+        admin = await users_collection.find_one({"email": email, "user_type": UserType.ADMIN})
     return admin
 
 async def authenticate_admin(email: str, password: str):
     admin = await get_admin_by_email(email)
     if not admin:
         return False
-    if not verify_password(password, admin["hashed_password"]):
+    with profile_stage("bcrypt.verify"):
+        password_ok = verify_password(password, admin["hashed_password"])
+    if not password_ok:
         return False
     return admin
 
@@ -112,23 +178,163 @@ async def read_admin_me(current_admin: User = Depends(get_current_admin)):
 async def register_user(user_data: UserCreate):
     """Register a new user"""
     users_collection = get_users_collection()
-    existing_user = await users_collection.find_one({"email": user_data.email})
+    with profile_stage("mongo.users.find_one"):
+        existing_user = await users_collection.find_one({"email": user_data.email})
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered",
         )
     
-    hashed_password = get_password_hash(user_data.password)
+    with profile_stage("bcrypt.hash"):
+        hashed_password = get_password_hash(user_data.password)
     user = User(
         email=user_data.email,
         full_name=user_data.full_name,
         hashed_password=hashed_password,
     )
     
-    await users_collection.insert_one(user.dict(by_alias=True))
+    with profile_stage("mongo.users.insert_one"):
+        await users_collection.insert_one(user.dict(by_alias=True))
     return user
 
+async def read_bulk_import_rows(request: Request) -> List[dict]:
+    """Read users from a JSON array, a raw CSV body or a multipart CSV upload ("file" field)"""
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("application/json"):
+        try:
+            payload = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        if isinstance(payload, dict):
+            payload = payload.get("users")
+        if not isinstance(payload, list) or not all(isinstance(row, dict) for row in payload):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of users or {\"users\": [...]}")
+        return payload
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        file = form.get("file")
+        if file is None or not hasattr(file, "read"):
+            raise HTTPException(status_code=400, detail="Missing CSV file in the \"file\" field")
+        if not file.filename.endswith('.csv'):
+            raise HTTPException(status_code=400, detail="Invalid file type. Please upload a CSV.")
+        contents = await file.read()
+    elif content_type.startswith("text/csv"):
+        contents = await request.body()
+    else:
+        raise HTTPException(status_code=415, detail="Send users as application/json, text/csv or a multipart CSV upload")
+
+    try:
+        # Fields beyond the header are collected as a list under CSV_EXTRA_FIELDS
+        reader = csv.DictReader(io.StringIO(contents.decode("utf-8-sig")), restkey=CSV_EXTRA_FIELDS)
+        return [
+            {
+                key.strip().lower(): value if isinstance(value, list) else (value or "").strip()
+                for key, value in row.items()
+            }
+            for row in reader
+        ]
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read CSV file: {e}")
+
+@router.post("/register/bulk")
+async def register_users_bulk(request: Request, current_admin: User = Depends(get_current_admin)):
+    """Register many users at once from CSV (email, full_name, password) or JSON.
+
+    Passwords are hashed in parallel across a process pool, existing emails are looked up
+    with a single query and new users are written with one unordered insert_many.
+    Returns a result per input row.
+    """
+    started = time.perf_counter()
+    rows = await read_bulk_import_rows(request)
+    if not rows:
+        raise HTTPException(status_code=400, detail="No users to import")
+    if len(rows) > BULK_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Too many users: {len(rows)}. At most {BULK_IMPORT_MAX_ROWS} per import.",
+        )
+
+    results = [{"row": i + 1, "email": row.get("email"), "status": None} for i, row in enumerate(rows)]
+
+    # Validate rows and drop repeated emails within the import (first one wins)
+    candidates = {}
+    for result, row in zip(results, rows):
+        if row.get(CSV_EXTRA_FIELDS):
+            result["status"] = "invalid"
+            result["detail"] = f"Row has {len(row[CSV_EXTRA_FIELDS])} more field(s) than the header"
+            continue
+        try:
+            user_data = UserCreate(**row)
+        except ValidationError as e:
+            result["status"] = "invalid"
+            result["detail"] = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            )
+            continue
+        result["email"] = user_data.email
+        if user_data.email in candidates:
+            result["status"] = "duplicate"
+            result["detail"] = f"Email repeated in import (row {candidates[user_data.email][0]['row']})"
+            continue
+        candidates[user_data.email] = (result, user_data)
+
+    # One query for all emails that are already registered
+    users_collection = get_users_collection()
+    if candidates:
+        with profile_stage("mongo.users.find"):
+            existing = await users_collection.find(
+                {"email": {"$in": list(candidates)}}, {"email": 1}
+            ).to_list(length=None)
+        for user in existing:
+            candidate = candidates.pop(user["email"], None)
+            if candidate is None:
+                continue
+            result, _ = candidate
+            result["status"] = "exists"
+            result["detail"] = "Email already registered"
+
+    pending = list(candidates.values())
+    if pending:
+        with profile_stage("bcrypt.hash_parallel"):
+            hashed_passwords = await hash_passwords_parallel([user_data.password for _, user_data in pending])
+
+        documents = [
+            User(
+                email=user_data.email,
+                full_name=user_data.full_name,
+                hashed_password=hashed_password,
+            ).dict(by_alias=True, exclude={"id"})
+            for (_, user_data), hashed_password in zip(pending, hashed_passwords)
+        ]
+
+        failed = {}
+        try:
+            with profile_stage("mongo.users.insert_many"):
+                await users_collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+
+        for index, (result, _) in enumerate(pending):
+            if index in failed:
+                result["status"] = "failed"
+                result["detail"] = failed[index]
+            else:
+                result["status"] = "created"
+
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+
+    return {
+        "total": len(results),
+        "summary": summary,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        "results": results,
+    }
+
 @router.post("/logout")
 async def logout_admin(current_admin: dict = Depends(get_current_admin)):
     """Logout admin (client should remove token)"""
@@ -1,113 +1,60 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, File, UploadFile, HTTPException, Query
 import pandas as pd
-from datetime import datetime, timedelta
 import io
+from typing import Literal, Optional
+
+from logic.client_hours import normalize_columns, prepare_client_hours, build_report
+from profiling import profile_stage, run_in_thread
 
 router = APIRouter()
 
 # In-memory storage for the processed data
+client_hours_frame = None
+# Legacy string report, built from client_hours_frame on first request
 client_hours_data = None
 
+def process_hours_csv(contents: bytes):
+    """Parse an uploaded client-hours CSV into the compact report frame. Raises ValueError for invalid files."""
+    if not contents:
+        raise ValueError("The uploaded file is empty")
+    
+    try:
+        with profile_stage("pandas.read_csv"):
+            df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
+    except UnicodeDecodeError:
+        raise ValueError("The uploaded file is not a valid CSV file or contains invalid characters")
+    except pd.errors.EmptyDataError:
+        raise ValueError("The uploaded CSV file is empty")
+    except pd.errors.ParserError as e:
+        raise ValueError(f"Error parsing CSV file: {str(e)}")
+    
+    # Debug: Print column names to see what we're working with
+    print(f"📊 CSV columns: {list(df.columns)}")
+    print(f"📏 CSV shape: {df.shape}")
+    
+    # Map columns to standard names (case-insensitive)
+    with profile_stage("pandas.normalize_columns"):
+        df, missing_columns = normalize_columns(df)
+    
+    # Check if all required columns are present after mapping
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {missing_columns}. Available columns: {list(df.columns)}")
+
+    # Parse times & keep a compact frame, reports are built from it on request
+    with profile_stage("pandas.prepare_client_hours"):
+        return prepare_client_hours(df, time_formats=["%I:%M:%S %p"])
+
 @router.post("/upload")
 async def upload_csv(file: UploadFile = File(...)):
-    global client_hours_data
+    global client_hours_frame, client_hours_data
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload a CSV.")
 
     try:
         contents = await file.read()
-        if not contents:
-            raise ValueError("The uploaded file is empty")
-        
-        try:
-            df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
-        except UnicodeDecodeError:
-            raise ValueError("The uploaded file is not a valid CSV file or contains invalid characters")
-        except pd.errors.EmptyDataError:
-            raise ValueError("The uploaded CSV file is empty")
-        except pd.errors.ParserError as e:
-            raise ValueError(f"Error parsing CSV file: {str(e)}")
-        
-        # Debug: Print column names to see what we're working with
-        print(f"📊 CSV columns: {list(df.columns)}")
-        print(f"📏 CSV shape: {df.shape}")
-        
-        # Check if required columns exist (case-insensitive)
-        required_columns = ["Client Name", "Start Time (PKT)", "End Time (PKT)", "Engineer Name", "Date"]
-        df_columns_lower = [col.lower().strip() for col in df.columns]
-        
-        # Map columns to standard names
-        column_mapping = {}
-        for req_col in required_columns:
-            for df_col in df.columns:
-                if req_col.lower().strip() == df_col.lower().strip():
-                    column_mapping[df_col] = req_col
-                    break
-        
-        print(f"🔗 Column mapping: {column_mapping}")
-        
-        # Rename columns to standard names
-        df = df.rename(columns=column_mapping)
-        
-        # Check if all required columns are present after mapping
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            raise ValueError(f"Missing required columns: {missing_columns}. Available columns: {list(df.columns)}")
-
-        # Normalize client names (case-insensitive)
-        df["Client Name"] = df["Client Name"].str.strip().str.title()
-
-        # Step 3: Parse times & calculate duration in minutes
-        def calculate_minutes(row):
-            try:
-                start_time_str = str(row["Start Time (PKT)"]).strip()
-                end_time_str = str(row["End Time (PKT)"]).strip()
-                
-                print(f"🕐 Parsing times: '{start_time_str}' to '{end_time_str}'")
-                
-                start = datetime.strptime(start_time_str, "%I:%M:%S %p")
-                end = datetime.strptime(end_time_str, "%I:%M:%S %p")
-                # Handle overnight shift
-                if end < start:
-                    end += timedelta(days=1)
-                minutes = int((end - start).seconds / 60)
-                print(f"⏱️ Calculated {minutes} minutes")
-                return minutes
-            except Exception as e:
-                print(f"❌ Time parsing error: {e} for row: {row.to_dict()}")
-                return 0
-
-        df["Minutes"] = df.apply(calculate_minutes, axis=1)
-
-        # Step 4: Convert minutes → HH:MM
-        def minutes_to_hhmm(minutes):
-            hours, mins = divmod(minutes, 60)
-            return f"{hours:02}:{mins:02}"
-
-        # Step 5: Build breakdown (Engineer + HH:MM + Date)
-        df["Breakdown"] = (
-            df["Engineer Name"].str.strip() +
-            " (" + df["Minutes"].apply(minutes_to_hhmm) + ")" +
-            " on " + df["Date"].astype(str)
-        )
-
-        # Step 6: Group by client
-        summary = df.groupby("Client Name").agg({
-            "Minutes": "sum",
-            "Breakdown": lambda x: " || ".join(x)
-        }).reset_index()
-
-        # Step 7: Sort descending by total minutes (before converting to string)
-        summary = summary.sort_values(by="Minutes", ascending=False)
-
-        # Step 8: Convert total minutes → HH:MM
-        summary["Total Hours Used"] = summary["Minutes"].apply(minutes_to_hhmm)
-        summary = summary.drop(columns=["Minutes"])
-
-        # Step 9: Reorder columns
-        summary = summary[["Client Name", "Total Hours Used", "Breakdown"]]
-
-        client_hours_data = summary.to_dict(orient="records")
+        # Parse in a worker thread so other requests aren't blocked while pandas runs
+        client_hours_frame = await run_in_thread(process_hours_csv, contents)
+        client_hours_data = None
 
         return {"message": "File uploaded and processed successfully."}
 
@@ -123,7 +70,19 @@ async def upload_csv(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
 
 @router.get("/hours")
-async def get_client_hours():
-    if client_hours_data is None:
-        return []
-    return client_hours_data
\ No newline at end of file
+async def get_client_hours(
+    breakdown: Literal["string", "structured"] = Query("string", description="Breakdown format"),
+    subtotals: bool = Query(False, description="Include per-engineer sub-totals (structured only)"),
+    max_entries: Optional[int] = Query(None, ge=0, description="Maximum entries per client (structured only)"),
+    offset: int = Query(0, ge=0, description="Number of clients to skip"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of clients to return"),
+):
+    global client_hours_data
+    with profile_stage("pandas.build_report"):
+        if client_hours_frame is None:
+            return build_report(None, breakdown, subtotals, max_entries, offset, limit)
+        if breakdown == "string" and offset == 0 and limit is None:
+            if client_hours_data is None:
+                client_hours_data = build_report(client_hours_frame)
+            return client_hours_data
+        return build_report(client_hours_frame, breakdown, subtotals, max_entries, offset, limit)
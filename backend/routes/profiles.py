@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import PlainTextResponse
+
+from models import User
+from routes.auth import get_current_admin
+from profiling import profiles, get_profile
+
+router = APIRouter()
+
+@router.get("/")
+async def list_profiles(current_admin: User = Depends(get_current_admin)):
+    """List the stored request profiles (most recent first)"""
+    return [
+        {key: profile[key] for key in ("id", "method", "path", "mode", "admin", "started_at", "duration_ms", "status_code")}
+        for profile in reversed(profiles)
+    ]
+
+@router.get("/{profile_id}")
+async def read_profile(profile_id: str, current_admin: User = Depends(get_current_admin)):
+    """Get a stored profile with its stage timings"""
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+@router.get("/{profile_id}/flamegraph", response_class=PlainTextResponse)
+async def read_profile_flamegraph(profile_id: str, current_admin: User = Depends(get_current_admin)):
+    """Folded stacks of a sampled profile, for flamegraph.pl / speedscope"""
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if profile["mode"] != "sample":
+        raise HTTPException(status_code=400, detail="Only sampled profiles have folded stacks")
+    return profile["folded"]
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from logic.salary_calculator import SalaryCalculator
+from profiling import profile_stage, run_in_thread
 
 router = APIRouter()
 
@@ -11,7 +12,9 @@ async def calculate_salary(file: UploadFile = File(...)):
     try:
         contents = await file.read()
         calculator = SalaryCalculator()
-        results = calculator.calculate(contents)
+        with profile_stage("salary.calculate"):
+            # Run in a worker thread so other requests aren't blocked during the calculation
+            results = await run_in_thread(calculator.calculate, contents)
         return {"results": results}
 
     except Exception as e:
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
+import asyncio
 import os
 from dotenv import load_dotenv
 import gspread
-from datetime import datetime
+from typing import List, Literal, Optional
+
+from logic.client_hours import REQUIRED_COLUMNS, frame_from_records, add_minutes_column, prepare_client_hours, build_report
+from profiling import profile_stage, run_in_thread
 
 load_dotenv()
 
@@ -17,6 +21,36 @@ SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
 SPREADSHEET_ID = os.getenv('GOOGLE_SPREADSHEET_ID', 'YOUR_SPREADSHEET_ID')  # Add a default or ensure it's in .env
 RANGE_NAME = os.getenv('GOOGLE_SHEET_RANGE', 'Sheet1!A1:B') # Add a default or ensure it's in .env
 
+# Maximum number of Google Sheets requests in flight for a multi-target call
+SHEETS_MAX_CONCURRENCY = int(os.getenv('GOOGLE_SHEETS_MAX_CONCURRENCY', 4))
+if SHEETS_MAX_CONCURRENCY < 1:
+    raise ValueError("GOOGLE_SHEETS_MAX_CONCURRENCY must be at least 1.")
+
+# Authorized gspread client, created on first use and shared across requests
+_gspread_client = None
+
+
+def get_gspread_client():
+    global _gspread_client
+    if _gspread_client is None:
+        creds_json = {
+            "type": os.getenv("GOOGLE_SERVICE_ACCOUNT_TYPE"),
+            "project_id": os.getenv("GOOGLE_PROJECT_ID"),
+            "private_key_id": os.getenv("GOOGLE_PRIVATE_KEY_ID"),
+            "private_key": os.getenv("GOOGLE_PRIVATE_KEY").replace('\\n', '\n'),
+            "client_email": os.getenv("GOOGLE_CLIENT_EMAIL"),
+            "client_id": os.getenv("GOOGLE_CLIENT_ID"),
+            "auth_uri": os.getenv("GOOGLE_AUTH_URI"),
+            "token_uri": os.getenv("GOOGLE_TOKEN_URI"),
+            "auth_provider_x509_cert_url": os.getenv("GOOGLE_AUTH_PROVIDER_X509_CERT_URL"),
+            "client_x509_cert_url": os.getenv("GOOGLE_CLIENT_X509_CERT_URL"),
+            "universe_domain": os.getenv("GOOGLE_UNIVERSE_DOMAIN")
+        }
+
+        creds = service_account.Credentials.from_service_account_info(creds_json, scopes=SCOPES)
+        _gspread_client = gspread.authorize(creds)
+    return _gspread_client
+
 
 def get_sheet_data():
     spreadsheet_id = os.getenv('GOOGLE_SPREADSHEET_ID')
@@ -25,103 +59,170 @@ def get_sheet_data():
     if not spreadsheet_id:
         raise ValueError("GOOGLE_SPREADSHEET_ID environment variable not set.")
 
-    creds_json = {
-        "type": os.getenv("GOOGLE_SERVICE_ACCOUNT_TYPE"),
-        "project_id": os.getenv("GOOGLE_PROJECT_ID"),
-        "private_key_id": os.getenv("GOOGLE_PRIVATE_KEY_ID"),
-        "private_key": os.getenv("GOOGLE_PRIVATE_KEY").replace('\\n', '\n'),
-        "client_email": os.getenv("GOOGLE_CLIENT_EMAIL"),
-        "client_id": os.getenv("GOOGLE_CLIENT_ID"),
-        "auth_uri": os.getenv("GOOGLE_AUTH_URI"),
-        "token_uri": os.getenv("GOOGLE_TOKEN_URI"),
-        "auth_provider_x509_cert_url": os.getenv("GOOGLE_AUTH_PROVIDER_X509_CERT_URL"),
-        "client_x509_cert_url": os.getenv("GOOGLE_CLIENT_X509_CERT_URL"),
-        "universe_domain": os.getenv("GOOGLE_UNIVERSE_DOMAIN")
-    }
-    
-    creds = service_account.Credentials.from_service_account_info(creds_json, scopes=SCOPES)
-    client = gspread.authorize(creds)
+    client = get_gspread_client()
     spreadsheet = client.open_by_key(spreadsheet_id)
     worksheet = spreadsheet.worksheet(sheet_name)
     return worksheet.get_all_records(), spreadsheet_id
 
+
+def parse_targets(targets: Optional[List[str]]):
+    """Parse "SPREADSHEET_ID:Worksheet" targets from the query string or GOOGLE_SHEET_TARGETS.
+
+    A target without a worksheet uses GOOGLE_SHEET_NAME. Returns None when no targets are configured.
+    """
+    if not targets:
+        env_targets = os.getenv('GOOGLE_SHEET_TARGETS')
+        if not env_targets:
+            return None
+        targets = [env_targets]
+
+    default_sheet_name = os.getenv('GOOGLE_SHEET_NAME', 'Sheet1')
+    parsed = []
+    for value in targets:
+        for target in value.split(','):
+            target = target.strip()
+            if not target:
+                continue
+            spreadsheet_id, _, sheet_name = target.partition(':')
+            spreadsheet_id = spreadsheet_id.strip()
+            if not spreadsheet_id:
+                raise ValueError(f"Invalid sheet target: '{target}'")
+            target_key = (spreadsheet_id, sheet_name.strip() or default_sheet_name)
+            if target_key not in parsed:
+                parsed.append(target_key)
+
+    if not parsed:
+        raise ValueError("No sheet targets given.")
+    return parsed
+
+
+async def fetch_sheet_targets(targets, max_concurrency: int = SHEETS_MAX_CONCURRENCY):
+    """Fetch every (spreadsheet_id, worksheet) target concurrently with a bounded number of in-flight requests.
+
+    Each spreadsheet is opened once per call. Failures are reported per target instead of raised.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1.")
+    client = get_gspread_client()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    opened_spreadsheets = {}
+
+    async def run_limited(func, *args):
+        async with semaphore:
+            return await run_in_thread(func, *args)
+
+    async def open_spreadsheet(spreadsheet_id):
+        if spreadsheet_id not in opened_spreadsheets:
+            opened_spreadsheets[spreadsheet_id] = asyncio.ensure_future(
+                run_limited(client.open_by_key, spreadsheet_id)
+            )
+        return await opened_spreadsheets[spreadsheet_id]
+
+    def read_records(spreadsheet, sheet_name):
+        return spreadsheet.worksheet(sheet_name).get_all_records()
+
+    async def fetch(spreadsheet_id, sheet_name):
+        result = {"spreadsheet_id": spreadsheet_id, "worksheet": sheet_name}
+        try:
+            spreadsheet = await open_spreadsheet(spreadsheet_id)
+            result["rows"] = await run_limited(read_records, spreadsheet, sheet_name)
+        except gspread.exceptions.SpreadsheetNotFound:
+            result["error"] = "Spreadsheet not found. Please check the spreadsheet ID and permissions."
+        except gspread.exceptions.WorksheetNotFound:
+            result["error"] = f"Worksheet not found: {sheet_name}"
+        except Exception as e:
+            result["error"] = f"An error occurred while reading the sheet: {e}"
+        return result
+
+    with profile_stage("sheets.fetch_targets"):
+        return await asyncio.gather(*(fetch(spreadsheet_id, sheet_name) for spreadsheet_id, sheet_name in targets))
+
+
+def report_target_errors(errors, sources):
+    """Log failed targets, raise when none of them could be read"""
+    for error in errors:
+        print(f"⚠️ Sheet target {error['spreadsheet_id']}:{error['worksheet']} failed: {error['error']}")
+    if errors and not sources:
+        raise HTTPException(status_code=404, detail=errors[0]["error"])
+
+
+def calculate_total_hours(all_rows):
+    """Total hours across sheet rows, or 0 if the rows cannot be processed"""
+    try:
+        with profile_stage("pandas.total_hours"):
+            df, missing_columns = frame_from_records(all_rows)
+            if missing_columns:
+                print(f"⚠️ Missing required columns for total calculation: {missing_columns}")
+                return 0
+            df = add_minutes_column(df)
+            return df["Minutes"].sum() / 60  # Convert to hours
+    except Exception as e:
+        print(f"Error calculating total hours: {e}")
+        return 0
+
+
 @router.get("/sheet-data")
-async def read_sheet_data():
+async def read_sheet_data(
+    targets: Optional[List[str]] = Query(None, description="Sheet targets as SPREADSHEET_ID:Worksheet")
+):
     """API endpoint to get and process sheet data."""
     try:
-        all_rows, spreadsheet_id = get_sheet_data()
+        try:
+            sheet_targets = parse_targets(targets)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if sheet_targets is not None:
+            results = await fetch_sheet_targets(sheet_targets)
+            all_rows = []
+            sources = []
+            errors = []
+            for result in results:
+                if "error" in result:
+                    errors.append(result)
+                    continue
+                all_rows.extend(result["rows"])
+                sources.append({
+                    "spreadsheet_id": result["spreadsheet_id"],
+                    "worksheet": result["worksheet"],
+                    "rows": len(result["rows"]),
+                    "total_hours": round(calculate_total_hours(result["rows"]), 2) if result["rows"] else 0,
+                })
+
+            total_hours = round(sum(source["total_hours"] for source in sources), 2)
+            if targets:
+                return {
+                    "total_hours": total_hours,
+                    "sources": sources,
+                    "errors": errors,
+                    "raw_data": all_rows
+                }
+
+            # Targets from GOOGLE_SHEET_TARGETS keep the single-sheet response shape
+            report_target_errors(errors, sources)
+            if not all_rows:
+                return {"message": "No data found."}
+            return {
+                "sheet_id": ",".join(dict.fromkeys(source["spreadsheet_id"] for source in sources)),
+                "total_hours": total_hours,
+                "raw_data": all_rows
+            }
+
+        with profile_stage("sheets.fetch"):
+            all_rows, spreadsheet_id = await run_in_thread(get_sheet_data)
         if not all_rows:
             return {"message": "No data found."}
 
         # Calculate total hours using the same logic as client-hours endpoint
-        try:
-            import pandas as pd
-            from datetime import timedelta
-            
-            df = pd.DataFrame(all_rows)
-            
-            # Check if required columns exist (case-insensitive)
-            required_columns = ["Client Name", "Start Time (PKT)", "End Time (PKT)", "Engineer Name", "Date"]
-            
-            # Map columns to standard names
-            column_mapping = {}
-            for req_col in required_columns:
-                for df_col in df.columns:
-                    if req_col.lower().strip() == df_col.lower().strip():
-                        column_mapping[df_col] = req_col
-                        break
-            
-            # Rename columns to standard names
-            df = df.rename(columns=column_mapping)
-            
-            # Check if all required columns are present after mapping
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                print(f"⚠️ Missing required columns for total calculation: {missing_columns}")
-                total_hours = 0
-            else:
-                # Calculate total minutes using the same logic
-                def calculate_minutes(row):
-                    try:
-                        start_time_str = str(row["Start Time (PKT)"]).strip()
-                        end_time_str = str(row["End Time (PKT)"]).strip()
-                        
-                        time_formats = ["%I:%M:%S %p", "%H:%M:%S", "%I:%M %p", "%H:%M"]
-                        
-                        start_time = None
-                        end_time = None
-                        
-                        for fmt in time_formats:
-                            try:
-                                start_time = datetime.strptime(start_time_str, fmt)
-                                end_time = datetime.strptime(end_time_str, fmt)
-                                break
-                            except ValueError:
-                                continue
-                        
-                        if start_time is None or end_time is None:
-                            return 0
-                        
-                        if end_time < start_time:
-                            end_time += timedelta(days=1)
-                        
-                        return int((end_time - start_time).seconds / 60)
-                    except Exception:
-                        return 0
-
-                df["Minutes"] = df.apply(calculate_minutes, axis=1)
-                total_minutes = df["Minutes"].sum()
-                total_hours = total_minutes / 60  # Convert to hours
-                
-        except Exception as e:
-            print(f"Error calculating total hours: {e}")
-            total_hours = 0
+        total_hours = calculate_total_hours(all_rows)
 
         return {
             "sheet_id": spreadsheet_id,
             "total_hours": round(total_hours, 2),
             "raw_data": all_rows
         }
+    except HTTPException:
+        raise
     except gspread.exceptions.SpreadsheetNotFound:
         raise HTTPException(status_code=404, detail="Spreadsheet not found. Please check the spreadsheet ID and permissions.")
     except gspread.exceptions.WorksheetNotFound as e:
@@ -130,123 +231,108 @@ async def read_sheet_data():
         raise HTTPException(status_code=500, detail=f"An error occurred while processing sheet data: {e}")
 
 @router.get("/client-hours")
-async def get_client_hours_from_sheet():
-    """API endpoint to get and calculate client hours from sheet data using the same logic as CSV upload."""
+async def get_client_hours_from_sheet(
+    targets: Optional[List[str]] = Query(None, description="Sheet targets as SPREADSHEET_ID:Worksheet"),
+    breakdown: Literal["string", "structured"] = Query("string", description="Breakdown format"),
+    subtotals: bool = Query(False, description="Include per-engineer sub-totals (structured only)"),
+    max_entries: Optional[int] = Query(None, ge=0, description="Maximum entries per client (structured only)"),
+    offset: int = Query(0, ge=0, description="Number of clients to skip"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of clients to return"),
+):
+    """API endpoint to get and calculate client hours from sheet data using the same logic as CSV upload.
+
+    With targets in the query string the rows of every worksheet are merged into one report and
+    the response also lists the sources that were read and the targets that failed. Targets from
+    GOOGLE_SHEET_TARGETS are merged the same way but only the report is returned.
+    """
+    report_options = {
+        "breakdown": breakdown,
+        "subtotals": subtotals,
+        "max_entries": max_entries,
+        "offset": offset,
+        "limit": limit,
+    }
     try:
-        all_rows, _ = get_sheet_data()
-        
-        # Convert sheet data to DataFrame-like structure for consistent processing
+        try:
+            sheet_targets = parse_targets(targets)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
         import pandas as pd
-        from datetime import timedelta
-        
-        if not all_rows:
-            return []
-        
-        # Create a DataFrame from the sheet data
-        df = pd.DataFrame(all_rows)
-        
-        # Debug: Print column names to see what we're working with
-        print(f"📊 Sheet columns: {list(df.columns)}")
-        print(f"📏 Sheet shape: {df.shape}")
-        
-        # Check if required columns exist (case-insensitive)
-        required_columns = ["Client Name", "Start Time (PKT)", "End Time (PKT)", "Engineer Name", "Date"]
-        df_columns_lower = [col.lower().strip() for col in df.columns]
-        
-        # Map columns to standard names
-        column_mapping = {}
-        for req_col in required_columns:
-            for df_col in df.columns:
-                if req_col.lower().strip() == df_col.lower().strip():
-                    column_mapping[df_col] = req_col
-                    break
-        
-        print(f"🔗 Column mapping: {column_mapping}")
-        
-        # Rename columns to standard names
-        df = df.rename(columns=column_mapping)
-        
-        # Check if all required columns are present after mapping
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            print(f"⚠️ Missing required columns: {missing_columns}. Available columns: {list(df.columns)}")
-            return []
-
-        # Normalize client names (case-insensitive)
-        df["Client Name"] = df["Client Name"].str.strip().str.title()
-
-        # Step 3: Parse times & calculate duration in minutes (same logic as CSV upload)
-        def calculate_minutes(row):
-            try:
-                start_time_str = str(row["Start Time (PKT)"]).strip()
-                end_time_str = str(row["End Time (PKT)"]).strip()
-                
-                print(f"🕐 Parsing times: '{start_time_str}' to '{end_time_str}'")
-                
-                # Try different time formats
-                time_formats = ["%I:%M:%S %p", "%H:%M:%S", "%I:%M %p", "%H:%M"]
-                
-                start_time = None
-                end_time = None
-                
-                for fmt in time_formats:
-                    try:
-                        start_time = datetime.strptime(start_time_str, fmt)
-                        end_time = datetime.strptime(end_time_str, fmt)
-                        break
-                    except ValueError:
-                        continue
-                
-                if start_time is None or end_time is None:
-                    print(f"❌ Could not parse time format for: '{start_time_str}' to '{end_time_str}'")
-                    return 0
-                
-                # Handle overnight shift
-                if end_time < start_time:
-                    end_time += timedelta(days=1)
-                
-                minutes = int((end_time - start_time).seconds / 60)
-                print(f"⏱️ Calculated {minutes} minutes")
-                return minutes
-            except Exception as e:
-                print(f"❌ Time parsing error: {e} for row: {row.to_dict()}")
-                return 0
 
-        df["Minutes"] = df.apply(calculate_minutes, axis=1)
+        if sheet_targets is not None:
+            results = await fetch_sheet_targets(sheet_targets)
+            frames = []
+            sources = []
+            errors = []
+            for result in results:
+                if "error" in result:
+                    errors.append(result)
+                    continue
+                if not result["rows"]:
+                    sources.append({"spreadsheet_id": result["spreadsheet_id"], "worksheet": result["worksheet"], "rows": 0})
+                    continue
+
+                # Normalize each worksheet on its own, headers may differ between tabs
+                df, missing_columns = frame_from_records(result["rows"])
+                if missing_columns:
+                    errors.append({
+                        "spreadsheet_id": result["spreadsheet_id"],
+                        "worksheet": result["worksheet"],
+                        "error": f"Missing required columns: {missing_columns}. Available columns: {list(df.columns)}"
+                    })
+                    continue
+                frames.append(df[REQUIRED_COLUMNS])
+                sources.append({"spreadsheet_id": result["spreadsheet_id"], "worksheet": result["worksheet"], "rows": len(df)})
+
+            print(f"📊 Sheet targets: {len(sheet_targets)}, read: {len(sources)}, failed: {len(errors)}")
+
+            frame = None
+            if frames:
+                with profile_stage("pandas.prepare_client_hours"):
+                    frame = prepare_client_hours(pd.concat(frames, ignore_index=True))
+            with profile_stage("pandas.build_report"):
+                report = build_report(frame, **report_options)
 
-        # Step 4: Convert minutes → HH:MM
-        def minutes_to_hhmm(minutes):
-            hours, mins = divmod(minutes, 60)
-            return f"{hours:02}:{mins:02}"
+            if not targets:
+                # Targets from GOOGLE_SHEET_TARGETS keep the single-sheet response shape
+                report_target_errors(errors, sources)
+                return report
 
-        # Step 5: Build breakdown (Engineer + HH:MM + Date)
-        df["Breakdown"] = (
-            df["Engineer Name"].str.strip() +
-            " (" + df["Minutes"].apply(minutes_to_hhmm) + ")" +
-            " on " + df["Date"].astype(str)
-        )
+            return {
+                "results": report,
+                "sources": sources,
+                "errors": errors
+            }
 
-        # Step 6: Group by client
-        summary = df.groupby("Client Name").agg({
-            "Minutes": "sum",
-            "Breakdown": lambda x: " || ".join(x)
-        }).reset_index()
+        with profile_stage("sheets.fetch"):
+            all_rows, _ = await run_in_thread(get_sheet_data)
 
-        # Step 7: Sort descending by total minutes (before converting to string)
-        summary = summary.sort_values(by="Minutes", ascending=False)
+        if not all_rows:
+            return build_report(None, **report_options)
+
+        # Create a DataFrame from the sheet data and map columns to standard names
+        df, missing_columns = frame_from_records(all_rows)
 
-        # Step 8: Convert total minutes → HH:MM
-        summary["Total Hours Used"] = summary["Minutes"].apply(minutes_to_hhmm)
-        summary = summary.drop(columns=["Minutes"])
+        # Debug: Print column names to see what we're working with
+        print(f"📊 Sheet columns: {list(df.columns)}")
+        print(f"📏 Sheet shape: {df.shape}")
 
-        # Step 9: Reorder columns
-        summary = summary[["Client Name", "Total Hours Used", "Breakdown"]]
+        # Check if all required columns are present after mapping
+        if missing_columns:
+            print(f"⚠️ Missing required columns: {missing_columns}. Available columns: {list(df.columns)}")
+            return build_report(None, **report_options)
 
-        return summary.to_dict(orient="records")
+        with profile_stage("pandas.prepare_client_hours"):
+            frame = prepare_client_hours(df)
+        with profile_stage("pandas.build_report"):
+            return build_report(frame, **report_options)
 
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
         print(f"❌ Sheet processing error: {e}")
         print(f"📋 Traceback: {error_details}")
-        raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
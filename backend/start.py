@@ -1,33 +1,93 @@
 #!/usr/bin/env python3
 """
 Startup script for SnapDev Portal FastAPI Backend
+
+    python3 start.py               # development server (auto-reload when DEBUG=True)
+    python3 start.py --production  # multi-worker production server (or SERVER_MODE=production)
 """
 
 import uvicorn
+import argparse
+import importlib.util
 import os
 from dotenv import load_dotenv
 
+from system import cpu_count
+
 # Load environment variables
 load_dotenv()
 
-def main():
+# Module-level state that lives in each worker process and is not shared between workers
+PROCESS_LOCAL_STATE = [
+    "routes.hours.client_hours_frame / client_hours_data (uploaded client hours)",
+    "profiling.profiles (recent request profiles, set PROFILE_DIR to keep them on disk)",
+    "admission.AdmissionControlMiddleware limiters / in_flight (ADMISSION_* limits apply per worker)",
+]
+
+def production_options():
+    """uvicorn options for the production server"""
+    has_uvloop = importlib.util.find_spec("uvloop") is not None
+    has_httptools = importlib.util.find_spec("httptools") is not None
+    if not has_uvloop or not has_httptools:
+        print("⚠️ uvloop/httptools not installed, falling back to the default event loop and HTTP parser")
+
+    return {
+        "workers": int(os.getenv("WEB_CONCURRENCY", cpu_count())),
+        "loop": "uvloop" if has_uvloop else "auto",
+        "http": "httptools" if has_httptools else "auto",
+        "timeout_keep_alive": int(os.getenv("KEEP_ALIVE_TIMEOUT", 5)),
+        "backlog": int(os.getenv("BACKLOG", 2048)),
+        # On SIGTERM stop accepting connections and give in-flight requests (e.g. uploads) this long to finish
+        "timeout_graceful_shutdown": int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", 30)),
+        "proxy_headers": True,
+        "forwarded_allow_ips": os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+    }
+
+def main(argv=None):
     """Main function to start the FastAPI server"""
+    parser = argparse.ArgumentParser(description="Start the SnapDev Portal API server")
+    parser.add_argument("--production", action="store_true", help="Run the multi-worker production server")
+    args = parser.parse_args(argv)
+
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", 8000))
     debug = os.getenv("DEBUG", "True").lower() == "true"
-    
+    production = args.production or os.getenv("SERVER_MODE", "development").lower() == "production"
+    log_level = os.getenv("LOG_LEVEL", "info")
+
     print("🚀 Starting SnapDev Portal API Server...")
     print(f"📍 Server will be available at: http://{host}:{port}")
     print(f"📚 API Documentation: http://{host}:{port}/docs")
+
+    if production:
+        options = production_options()
+        if debug:
+            print("⚠️ DEBUG is on but auto-reload is disabled in production mode")
+        print(f"🏭 Production mode: {options['workers']} workers, loop={options['loop']}, http={options['http']}")
+        if options["workers"] > 1:
+            print("⚠️ The following state is process-local and is not shared between workers:")
+            for state in PROCESS_LOCAL_STATE:
+                print(f"   - {state}")
+            print("   Requests that read it may be served by a different worker than the one that wrote it.")
+
+        uvicorn.run(
+            "main:app",
+            host=host,
+            port=port,
+            log_level=log_level,
+            **options
+        )
+        return
+
     print(f"🔧 Debug mode: {'ON' if debug else 'OFF'}")
-    
+
     uvicorn.run(
         "main:app",
         host=host,
         port=port,
         reload=debug,
-        log_level="info"
+        log_level=log_level
     )
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,9 @@
+import os
+
+
+def cpu_count():
+    """CPUs available to this process (respects container/affinity limits where supported)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
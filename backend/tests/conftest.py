@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the backend modules (routes, logic, ...) importable like when running from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,201 @@
+import asyncio
+
+import httpx
+import pytest
+
+import admission
+from routes.auth import create_access_token
+
+UPLOAD = "/api/hours/upload"
+
+
+class HeavyApp:
+    """ASGI app that reads the whole body and then waits for the gate before answering"""
+
+    def __init__(self, fail=False, wrap_body_errors=False):
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.started = 0
+        self.fail = fail
+        self.wrap_body_errors = wrap_body_errors
+
+    async def __call__(self, scope, receive, send):
+        received = 0
+        try:
+            while True:
+                message = await receive()
+                received += len(message.get("body", b""))
+                if not message.get("more_body"):
+                    break
+        except Exception as e:
+            # Like a framework turning a failed body read into its own error or error response
+            if self.wrap_body_errors:
+                raise ValueError("could not parse body") from e
+            await respond(send, 400, b"bad body")
+            return
+        self.started += 1
+        await self.gate.wait()
+        if self.fail:
+            raise RuntimeError("handler failed")
+        await respond(send, 200, str(received).encode())
+
+
+async def respond(send, status_code, body):
+    await send({"type": "http.response.start", "status": status_code, "headers": [(b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def auth_header(email):
+    return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+
+async def wait_until(condition):
+    for _ in range(1000):
+        if condition():
+            return
+        await asyncio.sleep(0.001)
+    raise AssertionError("condition not reached")
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    def set_limits(max_concurrent=2, queue_size=4, queue_timeout=10, max_per_admin=1, upload_max_bytes=100):
+        monkeypatch.setattr(admission, "ADMISSION_MAX_CONCURRENT", max_concurrent)
+        monkeypatch.setattr(admission, "ADMISSION_QUEUE_SIZE", queue_size)
+        monkeypatch.setattr(admission, "ADMISSION_QUEUE_TIMEOUT", queue_timeout)
+        monkeypatch.setattr(admission, "ADMISSION_MAX_PER_ADMIN", max_per_admin)
+        monkeypatch.setattr(admission, "UPLOAD_MAX_BYTES", upload_max_bytes)
+    set_limits()
+    return set_limits
+
+
+def run(test, app=None):
+    async def main():
+        heavy_app = app or HeavyApp()
+        middleware = admission.AdmissionControlMiddleware(heavy_app)
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await test(client, heavy_app, middleware)
+        # Every path gives back its slot and per-client count
+        assert middleware.in_flight == {}
+        for limiter in middleware.limiters.values():
+            assert limiter.waiting == 0
+            assert limiter.semaphore._value == admission.ADMISSION_MAX_CONCURRENT
+
+    asyncio.run(main())
+
+
+def test_other_routes_are_not_limited(limits):
+    async def test(client, app, middleware):
+        response = await client.post("/api/auth/login", content=b"x" * 500)
+        assert response.status_code == 200
+
+    run(test)
+
+
+def test_content_length_over_limit_is_rejected_before_the_app(limits):
+    async def test(client, app, middleware):
+        response = await client.post(UPLOAD, content=b"x" * 101)
+        assert response.status_code == 413
+        assert response.json() == {"detail": "Upload too large. The limit is 100 bytes."}
+        assert "retry-after" not in response.headers
+        assert app.started == 0
+
+    run(test)
+
+
+def test_streamed_body_over_limit_replaces_the_app_response(limits):
+    async def body():
+        for _ in range(3):
+            yield b"x" * 40
+
+    async def test(client, app, middleware):
+        response = await client.post(UPLOAD, content=body())
+        assert "content-length" not in response.request.headers
+        assert response.status_code == 413
+        assert response.json()["detail"] == "Upload too large. The limit is 100 bytes."
+
+        response = await client.post(UPLOAD, content=b"x" * 100)
+        assert response.status_code == 200
+
+    run(test)
+
+
+def test_streamed_body_over_limit_replaces_a_wrapped_app_error(limits):
+    async def body():
+        for _ in range(3):
+            yield b"x" * 40
+
+    async def test(client, app, middleware):
+        response = await client.post(UPLOAD, content=body())
+        assert response.status_code == 413
+
+    run(test, HeavyApp(wrap_body_errors=True))
+
+
+def test_second_request_from_the_same_admin_gets_429(limits):
+    async def test(client, app, middleware):
+        app.gate.clear()
+        first = asyncio.create_task(client.post(UPLOAD, content=b"a", headers=auth_header("a@example.com")))
+        await wait_until(lambda: app.started == 1)
+
+        response = await client.post(UPLOAD, content=b"a", headers=auth_header("a@example.com"))
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == str(admission.ADMISSION_RETRY_AFTER)
+
+        other = asyncio.create_task(client.post(UPLOAD, content=b"b", headers=auth_header("b@example.com")))
+        await wait_until(lambda: app.started == 2)
+
+        app.gate.set()
+        assert (await first).status_code == 200
+        assert (await other).status_code == 200
+
+    run(test)
+
+
+def test_full_queue_gets_503_and_waiters_run_later(limits):
+    limits(max_concurrent=1, queue_size=1, max_per_admin=10)
+
+    async def test(client, app, middleware):
+        limiter = middleware.limiters[("POST", UPLOAD)]
+        app.gate.clear()
+        running = asyncio.create_task(client.post(UPLOAD, content=b"1"))
+        await wait_until(lambda: app.started == 1)
+        waiting = asyncio.create_task(client.post(UPLOAD, content=b"2"))
+        await wait_until(lambda: limiter.waiting == 1)
+
+        response = await client.post(UPLOAD, content=b"3")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == str(admission.ADMISSION_RETRY_AFTER)
+
+        app.gate.set()
+        assert (await running).status_code == 200
+        assert (await waiting).status_code == 200
+        assert app.started == 2
+
+    run(test)
+
+
+def test_queue_timeout_gets_503(limits):
+    limits(max_concurrent=1, queue_timeout=0.05, max_per_admin=10)
+
+    async def test(client, app, middleware):
+        app.gate.clear()
+        running = asyncio.create_task(client.post(UPLOAD, content=b"1"))
+        await wait_until(lambda: app.started == 1)
+
+        response = await client.post(UPLOAD, content=b"2")
+        assert response.status_code == 503
+
+        app.gate.set()
+        assert (await running).status_code == 200
+
+    run(test)
+
+
+def test_failing_handler_releases_its_slot(limits):
+    async def test(client, app, middleware):
+        with pytest.raises(RuntimeError):
+            await client.post(UPLOAD, content=b"1")
+
+    run(test, HeavyApp(fail=True))
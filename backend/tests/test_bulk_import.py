@@ -0,0 +1,123 @@
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from pymongo.errors import BulkWriteError
+
+from loadtest import FakeCollection
+from routes import auth
+
+
+class UniqueIndexCollection(FakeCollection):
+    """Rejects inserts for some emails the way a unique index would after a concurrent import"""
+
+    def __init__(self, rejected_emails):
+        super().__init__()
+        self.rejected_emails = rejected_emails
+
+    async def insert_many(self, documents, ordered=True):
+        write_errors = [
+            {"index": index, "code": 11000, "errmsg": f"E11000 duplicate key: {document['email']}"}
+            for index, document in enumerate(documents)
+            if document["email"] in self.rejected_emails
+        ]
+        await super().insert_many(
+            [document for document in documents if document["email"] not in self.rejected_emails], ordered
+        )
+        if write_errors:
+            raise BulkWriteError({"writeErrors": write_errors, "nInserted": len(documents) - len(write_errors)})
+
+
+async def fake_hash_passwords(passwords):
+    return [f"hashed:{password}" for password in passwords]
+
+
+@pytest.fixture
+def users(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(auth, "get_users_collection", lambda: collection)
+    monkeypatch.setattr(auth, "hash_passwords_parallel", fake_hash_passwords)
+    return collection
+
+
+def post_bulk(**kwargs):
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/api/auth")
+    app.dependency_overrides[auth.get_current_admin] = lambda: None
+
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/auth/register/bulk", **kwargs)
+
+    return asyncio.run(send())
+
+
+def test_csv_row_with_extra_fields_is_invalid(users):
+    response = post_bulk(
+        content=b"email,full_name,password\nz@example.com,Z,p1,extra\ny@example.com,Y,p2\n",
+        headers={"content-type": "text/csv"},
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0]["status"] == "invalid"
+    assert results[0]["detail"] == "Row has 1 more field(s) than the header"
+    assert results[1]["status"] == "created"
+    assert [user["email"] for user in users.documents] == ["y@example.com"]
+
+
+def test_json_import_reports_a_status_per_row(users):
+    asyncio.run(users.insert_one({"email": "old@example.com", "full_name": "Old"}))
+
+    response = post_bulk(json=[
+        {"email": "a@example.com", "full_name": "A", "password": "p1"},
+        {"email": "old@example.com", "full_name": "Old", "password": "p2"},
+        {"email": "a@example.com", "full_name": "A again", "password": "p3"},
+        {"email": "not-an-email", "full_name": "B", "password": "p4"},
+        {"email": "c@example.com", "full_name": "C", "password": "p5"},
+    ])
+
+    body = response.json()
+    assert [result["status"] for result in body["results"]] == ["created", "exists", "duplicate", "invalid", "created"]
+    assert body["results"][2]["detail"] == "Email repeated in import (row 1)"
+    assert body["summary"] == {"created": 2, "exists": 1, "duplicate": 1, "invalid": 1}
+    created = [user for user in users.documents if user["email"] in ("a@example.com", "c@example.com")]
+    assert [user["hashed_password"] for user in created] == ["hashed:p1", "hashed:p5"]
+
+
+def test_bulk_write_errors_map_to_their_rows(monkeypatch):
+    collection = UniqueIndexCollection({"b@example.com"})
+    monkeypatch.setattr(auth, "get_users_collection", lambda: collection)
+    monkeypatch.setattr(auth, "hash_passwords_parallel", fake_hash_passwords)
+
+    response = post_bulk(json={"users": [
+        {"email": "bad", "full_name": "X", "password": "p0"},
+        {"email": "a@example.com", "full_name": "A", "password": "p1"},
+        {"email": "b@example.com", "full_name": "B", "password": "p2"},
+        {"email": "c@example.com", "full_name": "C", "password": "p3"},
+    ]})
+
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == ["invalid", "created", "failed", "created"]
+    assert results[2]["detail"] == "E11000 duplicate key: b@example.com"
+    assert sorted(user["email"] for user in collection.documents) == ["a@example.com", "c@example.com"]
+
+
+def test_broken_hash_pool_is_reset_and_reported(monkeypatch):
+    class BrokenExecutor:
+        def submit(self, *args, **kwargs):
+            raise BrokenProcessPool("worker died")
+
+        def shutdown(self, **kwargs):
+            pass
+
+    monkeypatch.setattr(auth, "_hash_executor", BrokenExecutor())
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(auth.hash_passwords_parallel(["p1", "p2"]))
+
+    assert error.value.status_code == 500
+    assert auth._hash_executor is None
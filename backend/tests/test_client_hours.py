@@ -0,0 +1,50 @@
+import io
+
+import pandas as pd
+
+from logic.client_hours import normalize_columns, prepare_client_hours, build_report
+
+CSV = b"""client name,Start Time (PKT),End Time (PKT),Engineer Name,Date
+acme,09:00:00 AM,10:30:00 AM,Ali Khan,2024-01-01
+,09:00:00 AM,11:00:00 AM,Sara Ahmed,2024-01-01
+globex,11:00:00 PM,01:00:00 AM,Sara Ahmed,2024-01-02
+Acme ,01:00:00 PM,01:15:00 PM,Sara Ahmed,2024-01-03
+"""
+
+
+def prepared_frame():
+    df, missing_columns = normalize_columns(pd.read_csv(io.BytesIO(CSV)))
+    assert missing_columns == []
+    return prepare_client_hours(df)
+
+
+def test_blank_client_rows_are_dropped():
+    frame = prepared_frame()
+
+    assert sorted(frame["Client Name"].unique()) == ["Acme", "Globex"]
+
+
+def test_string_report():
+    assert build_report(prepared_frame()) == [
+        {"Client Name": "Globex", "Total Hours Used": "02:00", "Breakdown": "Sara Ahmed (02:00) on 2024-01-02"},
+        {
+            "Client Name": "Acme",
+            "Total Hours Used": "01:45",
+            "Breakdown": "Ali Khan (01:30) on 2024-01-01 || Sara Ahmed (00:15) on 2024-01-03",
+        },
+    ]
+
+
+def test_structured_report_truncates_and_paginates():
+    report = build_report(prepared_frame(), "structured", subtotals=True, max_entries=1, offset=1, limit=1)
+
+    assert report["Total Clients"] == 2
+    assert report["Clients"] == [{
+        "Client Name": "Acme",
+        "Total Hours Used": "01:45",
+        "Total Minutes": 105,
+        "Entry Count": 2,
+        "Entries": [["Ali Khan", 90, "2024-01-01"]],
+        "Truncated": True,
+        "Engineer Subtotals": [["Ali Khan", 90], ["Sara Ahmed", 15]],
+    }]
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+import time
+
+import pandas as pd
+
+import profiling
+
+
+def pandas_work():
+    frame = pd.DataFrame({"client": ["acme", "globex"] * 5000, "minutes": range(10000)})
+    deadline = time.perf_counter() + 0.1
+    while time.perf_counter() < deadline:
+        frame.groupby("client")["minutes"].sum()
+
+
+async def profiled_request(profiler):
+    token = profiling._current_profiler.set(profiler)
+    profiler.start()
+    try:
+        await profiling.run_in_thread(pandas_work)
+    finally:
+        profiler.stop()
+        profiling._current_profiler.reset(token)
+
+
+def test_sampling_profiler_sees_worker_threads():
+    async def main():
+        profiler = profiling.SamplingProfiler(threading.get_ident(), interval=0.001)
+        await profiled_request(profiler)
+        return profiler
+
+    profiler = asyncio.run(main())
+
+    worker_stacks = [stack for stack in profiler.stacks if "pandas_work" in stack]
+    assert worker_stacks
+    assert not any(stack.startswith("MainThread;") for stack in worker_stacks)
+    assert any(stack.startswith("MainThread;") for stack in profiler.stacks)
+
+
+def test_cprofile_merges_worker_threads():
+    async def main():
+        profiler = profiling.DeterministicProfiler(limit=200)
+        await profiled_request(profiler)
+        return profiler
+
+    stats = asyncio.run(main()).stats()
+
+    assert "pandas_work" in stats
+    assert "groupby" in stats
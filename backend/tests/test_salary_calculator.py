@@ -0,0 +1,18 @@
+from logic.salary_calculator import SalaryCalculator
+
+CSV = b"""workers,start_time,end_time
+zara,2024-01-01T11:00:00+05:00,2024-01-01T13:00:00+05:00
+Ali,2024-01-01T09:00:00+05:00,2024-01-01T10:00:00+05:00
+"""
+
+
+def test_calculate_sorts_workers_and_splits_rates():
+    rows = SalaryCalculator().calculate(CSV)
+
+    assert [row["Worker"] for row in rows] == ["Ali", "zara"]
+    assert rows[1] == {
+        "Worker": "zara",
+        "Total time": "02:00:00",
+        "Total payment": "3500.00",
+        "Payment breakdown": "1500 x 1 hours 0 minutes 0 seconds & 2000 x 1 hours 0 minutes 0 seconds",
+    }
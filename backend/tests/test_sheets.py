@@ -0,0 +1,169 @@
+import asyncio
+import threading
+import time
+
+import gspread
+import pytest
+
+from routes import sheets
+
+
+class FakeWorksheet:
+    def __init__(self, client, records):
+        self.client = client
+        self.records = records
+
+    def get_all_records(self):
+        with self.client.track():
+            return list(self.records)
+
+
+class FakeSpreadsheet:
+    def __init__(self, client, worksheets):
+        self.client = client
+        self.worksheets = worksheets
+
+    def worksheet(self, name):
+        with self.client.track():
+            if name not in self.worksheets:
+                raise gspread.exceptions.WorksheetNotFound(name)
+            return FakeWorksheet(self.client, self.worksheets[name])
+
+
+class FakeGspreadClient:
+    """Local gspread stand-in that counts opens and the peak number of calls in flight"""
+
+    def __init__(self, spreadsheets, latency=0.02):
+        self.spreadsheets = spreadsheets
+        self.latency = latency
+        self.opened = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def track(self):
+        client = self
+
+        class Tracker:
+            def __enter__(self):
+                with client._lock:
+                    client.in_flight += 1
+                    client.peak_in_flight = max(client.peak_in_flight, client.in_flight)
+                time.sleep(client.latency)
+
+            def __exit__(self, *exc):
+                with client._lock:
+                    client.in_flight -= 1
+
+        return Tracker()
+
+    def open_by_key(self, spreadsheet_id):
+        with self.track():
+            self.opened[spreadsheet_id] = self.opened.get(spreadsheet_id, 0) + 1
+            if spreadsheet_id not in self.spreadsheets:
+                raise gspread.exceptions.SpreadsheetNotFound(spreadsheet_id)
+            return FakeSpreadsheet(self, self.spreadsheets[spreadsheet_id])
+
+
+ROW = {
+    "Client Name": "acme",
+    "Start Time (PKT)": "09:00:00 AM",
+    "End Time (PKT)": "10:30:00 AM",
+    "Engineer Name": "Ali Khan",
+    "Date": "2024-01-02",
+}
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    client = FakeGspreadClient({
+        "book-a": {"January": [ROW, ROW], "February": [ROW]},
+        "book-b": {"January": [ROW]},
+    })
+    monkeypatch.setattr(sheets, "get_gspread_client", lambda: client)
+    return client
+
+
+def test_parse_targets(monkeypatch):
+    monkeypatch.setenv("GOOGLE_SHEET_NAME", "Hours")
+    monkeypatch.delenv("GOOGLE_SHEET_TARGETS", raising=False)
+
+    assert sheets.parse_targets(None) is None
+    assert sheets.parse_targets(["book-a:January,book-b", "book-a:January"]) == [
+        ("book-a", "January"),
+        ("book-b", "Hours"),
+    ]
+    with pytest.raises(ValueError):
+        sheets.parse_targets([":January"])
+
+    monkeypatch.setenv("GOOGLE_SHEET_TARGETS", "book-c:March")
+    assert sheets.parse_targets(None) == [("book-c", "March")]
+
+
+def test_fetch_reports_partial_failures(fake_client):
+    results = asyncio.run(sheets.fetch_sheet_targets([
+        ("book-a", "January"),
+        ("book-a", "March"),
+        ("missing-book", "January"),
+        ("book-b", "January"),
+    ]))
+
+    assert [len(result.get("rows", [])) for result in results] == [2, 0, 0, 1]
+    assert "error" not in results[0] and "error" not in results[3]
+    assert results[1]["error"] == "Worksheet not found: March"
+    assert results[2]["error"].startswith("Spreadsheet not found")
+
+
+def test_fetch_opens_each_spreadsheet_once(fake_client):
+    asyncio.run(sheets.fetch_sheet_targets([
+        ("book-a", "January"),
+        ("book-a", "February"),
+        ("book-b", "January"),
+    ]))
+
+    assert fake_client.opened == {"book-a": 1, "book-b": 1}
+
+
+def test_fetch_respects_concurrency_bound(monkeypatch):
+    client = FakeGspreadClient({f"book-{i}": {"January": [ROW]} for i in range(8)})
+    monkeypatch.setattr(sheets, "get_gspread_client", lambda: client)
+
+    results = asyncio.run(sheets.fetch_sheet_targets(
+        [(f"book-{i}", "January") for i in range(8)], max_concurrency=2
+    ))
+
+    assert all("error" not in result for result in results)
+    assert client.peak_in_flight == 2
+
+
+def test_fetch_rejects_zero_concurrency(fake_client):
+    with pytest.raises(ValueError):
+        asyncio.run(sheets.fetch_sheet_targets([("book-a", "January")], max_concurrency=0))
+
+
+def client_hours(targets=None):
+    return asyncio.run(sheets.get_client_hours_from_sheet(
+        targets=targets, breakdown="string", subtotals=False, max_entries=None, offset=0, limit=None
+    ))
+
+
+def test_client_hours_wraps_only_query_targets(fake_client, monkeypatch):
+    monkeypatch.setenv("GOOGLE_SHEET_TARGETS", "book-a:January,book-b:January")
+
+    report = client_hours()
+    assert report == [{"Client Name": "Acme", "Total Hours Used": "04:30", "Breakdown": report[0]["Breakdown"]}]
+
+    wrapped = client_hours(["book-a:January", "book-a:March"])
+    assert wrapped["results"][0]["Total Hours Used"] == "03:00"
+    assert [source["worksheet"] for source in wrapped["sources"]] == ["January"]
+    assert wrapped["errors"][0]["error"] == "Worksheet not found: March"
+
+
+def test_sheet_data_keeps_legacy_shape_for_env_targets(fake_client, monkeypatch):
+    monkeypatch.setenv("GOOGLE_SHEET_TARGETS", "book-a:January,book-b:January,book-a:March")
+
+    data = asyncio.run(sheets.read_sheet_data(targets=None))
+
+    assert set(data) == {"sheet_id", "total_hours", "raw_data"}
+    assert data["sheet_id"] == "book-a,book-b"
+    assert data["total_hours"] == 4.5